@@ -43,47 +43,78 @@ def dependency_graph_inline(log_dict, transition_name='task'):
     return df
 
 
-def read_from_file(filename):
-    log_data = {}
-    
-    # Parse the XES file
-    tree = ET.parse(filename)
-    root = tree.getroot()
-    
-    ns = {'xes': 'http://www.xes-standard.org/'} 
+XES_NAMESPACE = '{http://www.xes-standard.org/}'
+
+def parse_timestamp(value):
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).replace(tzinfo=None)
+
+# XES attribute element -> function that decodes its value attribute
+XES_TYPES = {
+    'string': str,
+    'id': str,
+    'int': int,
+    'float': float,
+    'boolean': lambda value: value.lower() == 'true',
+    'date': parse_timestamp,
+}
+
+"""
+Streams the XES file one trace at a time and yields (case_id, events) pairs.
+Every finished <trace> element is cleared, so memory stays bounded by the largest trace
+instead of the whole document. Traces without a concept:name are skipped.
+When attributes is given, only those event attributes are decoded and kept.
+"""
+def iter_traces(filename, attributes=None):
+    context = ET.iterparse(filename, events=('start', 'end'))
+    _, root = next(context)
     
-    # Loop through each trace (representing a case) in the XES file
-    for trace in root.findall('xes:trace', ns):
+    for action, element in context:
+        if action != 'end' or element.tag != XES_NAMESPACE + 'trace':
+            continue
+        
         case_id = None
         events = []
         
-        # Get the trace's case ID (usually in a concept:name attribute)
-        for attr in trace.findall('xes:string', ns):
-            if attr.attrib['key'] == 'concept:name':
-                case_id = attr.attrib['value']
-        
-        # Loop through each event in the trace
-        for event in trace.findall('xes:event', ns):
-            event_data = {}
+        for child in element:
+            # Get the trace's case ID (usually in a concept:name attribute)
+            if child.tag == XES_NAMESPACE + 'string' and child.attrib['key'] == 'concept:name':
+                case_id = child.attrib['value']
             
-            # Extract attributes from the event
-            for attr in event:
-                key = attr.attrib['key']
-                value = attr.attrib['value']
-                
-                # Parse the value based on the type of the attribute key
-                if key == 'cost':
-                    value = int(value)
-                elif key == 'time:timestamp':
-                    # Parse the timestamp into a datetime object
-                    value = datetime.fromisoformat(value.replace('Z', '+00:00')).replace(tzinfo=None)
-                
-                event_data[key] = value
-            
-            events.append(event_data)
+            # Loop through each event in the trace
+            elif child.tag == XES_NAMESPACE + 'event':
+                events.append(parse_event(child, attributes))
+        
+        # Drop the finished trace (and the reference the root keeps to it)
+        element.clear()
+        root.clear()
         
         if case_id:
-            log_data[case_id] = events
+            yield case_id, events
+
+
+def parse_event(event, attributes=None):
+    event_data = {}
+    
+    # Extract attributes from the event
+    for attr in event:
+        key = attr.attrib['key']
+        
+        # Skipped attributes are never decoded
+        if attributes is not None and key not in attributes:
+            continue
+        
+        # Parse the value based on the XES element it is stored in (<int>, <date>, <boolean>, ...)
+        decode = XES_TYPES.get(attr.tag.rpartition('}')[2], str)
+        event_data[key] = decode(attr.attrib['value'])
+    
+    return event_data
+
+
+def read_from_file(filename, attributes=None):
+    log_data = {}
+    
+    for case_id, events in iter_traces(filename, attributes):
+        log_data[case_id] = events
     
     return log_data
     
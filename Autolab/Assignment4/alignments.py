@@ -0,0 +1,234 @@
+import heapq
+import time
+import numpy as np
+from index import all_traces_with_counts
+from replay import compile_model
+
+# Placeholder for the missing side of a log move or a model move
+SKIP = '>>'
+
+CLOCK_INTERVAL = 256 # expanded states between two checks of the timeout
+
+
+"""
+Optimal alignments of traces on an alpha mined net.
+A* searches the synchronous product of the trace and the net, where a state is (marking, position
+in the trace) and the moves are:
+ - synchronous move: fire a transition labelled with the next event, cost 0
+ - log move: skip the next event, cost 1
+ - model move: fire any enabled transition, cost 1
+The heuristic is a lower bound of the marking equation relaxation: with x the transitions fired as
+model or synchronous moves, reaching the final marking needs m + effect.x = final, and the events of
+the remaining suffix the model does not fire are log moves. Every dual solution of that linear
+program, a place potential y with effect[t].y <= 1 for every transition and a label weight
+z[a] = min(1, -effect[t].y) over the transitions labelled a (1 for activities without one),
+bounds the cost from (marking, i) from below by y.(final - marking) + sum of z over trace[i:].
+The bound is consistent (no move lowers it by more than its cost), so the first goal popped is
+optimal. The search takes the maximum over a few potentials: 0 (which counts the events without
+a transition) and the distances of the places from start and to end, scaled into the constraint.
+Every search is bounded by max_states states and timeout seconds (the clock is read every
+CLOCK_INTERVAL expanded states), a trace that hits a limit gets a result without alignment
+instead of stalling the batch. Results are cached per variant.
+"""
+class Aligner():
+    def __init__(self, model, max_states=100000, timeout=5.0, heuristic=True):
+        self.net = compile_model(model)
+        self.max_states = max_states
+        self.timeout = timeout
+        self.pre = self.net.pre.T.astype(np.int64) # transition -> input arcs
+        self.effect = self.net.effect.T.astype(np.int64)
+
+        self.final_marking = np.zeros(self.net.number_of_places(), dtype=np.int64)
+        self.final_marking[self.net.place_index['end']] = 1
+        self.initial_marking = self.net.initial_marking.astype(np.int64)
+
+        self.label_transitions = {} # activity -> transition indexes with that name
+        for t, name in enumerate(self.net.names):
+            self.label_transitions.setdefault(name, []).append(t)
+        self.build_potentials(heuristic)
+
+        self.cache = {}
+        self.empty_cost = None
+
+    def align(self, trace):
+        key = tuple(trace)
+        if key not in self.cache:
+            self.cache[key] = self.search(key)
+        return self.cache[key]
+
+    def search(self, trace):
+        started = time.perf_counter()
+        n = len(trace)
+
+        # suffix[:, i] -> label weights of trace[i:] for every potential
+        suffix = np.zeros((len(self.potentials), n + 1))
+        for i in range(n - 1, -1, -1):
+            suffix[:, i] = suffix[:, i + 1] + self.label_weights.get(trace[i], self.unknown_weight)
+
+        def heuristic(potential, i):
+            bound = (self.final_potential - potential + suffix[:, i]).max()
+            # Costs are integers, so is the bound
+            return max(0, int(np.ceil(bound - 1e-9)))
+
+        start = (self.initial_marking.tobytes(), 0)
+        start_potential = self.potentials @ self.initial_marking
+        best = {start: 0}
+        previous = {} # state -> (previous state, move)
+        # (bound, -position, cost, push counter, state, potentials): equal bounds go deeper in the trace first
+        queue = [(heuristic(start_potential, 0), 0, 0, 0, start, start_potential)]
+        counter = 0
+        expanded = 0
+        final = self.final_marking.tobytes()
+
+        while queue:
+            _, _, cost, _, state, potential = heapq.heappop(queue)
+            if best[state] < cost:
+                continue
+
+            packed, i = state
+            if i == n and packed == final:
+                return self.result('optimal', cost, self.path(previous, state), len(best), started)
+
+            if len(best) > self.max_states:
+                return self.result('state budget', None, None, len(best), started)
+            expanded += 1
+            if expanded % CLOCK_INTERVAL == 0 and time.perf_counter() - started > self.timeout:
+                return self.result('timeout', None, None, len(best), started)
+
+            marking = np.frombuffer(packed, dtype=np.int64)
+            enabled = np.flatnonzero((marking >= self.pre).all(axis=1))
+            moves = []
+            if i < n:
+                moves.append((packed, i + 1, 1, (trace[i], SKIP), None))
+                for t in self.label_transitions.get(trace[i], []):
+                    if t in enabled:
+                        moves.append(((marking + self.effect[t]).tobytes(), i + 1, 0, (trace[i], self.net.names[t]), t))
+            for t in enabled:
+                moves.append(((marking + self.effect[t]).tobytes(), i, 1, (SKIP, self.net.names[t]), t))
+
+            for following, j, step, move, t in moves:
+                next_state = (following, j)
+                next_cost = cost + step
+                if next_cost < best.get(next_state, next_cost + 1):
+                    best[next_state] = next_cost
+                    previous[next_state] = (state, move)
+                    counter += 1
+                    next_potential = potential if t is None else potential + self.gains[:, t]
+                    heapq.heappush(queue, (next_cost + heuristic(next_potential, j), -j, next_cost, counter, next_state, next_potential))
+
+        # The final marking is not reachable at all
+        return self.result('unreachable', None, None, len(best), started)
+
+    """
+    Place potentials (one per row) of the heuristic and their label weights, see the class docstring.
+    With heuristic=False the only potential is 0 and every weight is 0, i.e. the search is Dijkstra.
+    """
+    def build_potentials(self, heuristic=True):
+        places = self.net.number_of_places()
+        post = self.pre + self.effect
+        candidates = [np.zeros(places)]
+        if heuristic:
+            from_start = self.distances(self.pre, post, self.initial_marking > 0)
+            to_end = self.distances(post, self.pre, self.final_marking > 0)
+            candidates += [from_start, -from_start, -to_end, to_end]
+
+        potentials = []
+        for y in candidates:
+            gain = self.effect @ y
+            if len(gain) and gain.max() > 1:
+                y = y / gain.max()
+            potentials.append(y)
+        self.potentials = np.array(potentials) # potential -> place -> y
+        self.gains = self.potentials @ self.effect.T # potential -> transition -> effect[t].y
+        self.final_potential = self.potentials @ self.final_marking
+
+        self.label_weights = {}
+        for name, transitions in self.label_transitions.items():
+            self.label_weights[name] = np.minimum(1, -self.gains[:, transitions].max(axis=1)) if heuristic else np.zeros(len(potentials))
+        self.unknown_weight = np.ones(len(potentials)) if heuristic else np.zeros(len(potentials))
+
+    # Transitions between the sources and every place, following the arcs from inputs to outputs
+    def distances(self, inputs, outputs, sources):
+        distance = np.where(sources, 0.0, np.inf)
+        changed = True
+        while changed:
+            changed = False
+            for t in range(len(inputs)):
+                before = distance[inputs[t] > 0]
+                if len(before) == 0 or np.isinf(before).any():
+                    continue
+                after = outputs[t] > 0
+                reached = np.minimum(distance[after], before.max() + 1)
+                if (reached < distance[after]).any():
+                    distance[after] = reached
+                    changed = True
+        return np.where(np.isinf(distance), 0.0, distance)
+
+    def path(self, previous, state):
+        moves = []
+        while state in previous:
+            state, move = previous[state]
+            moves.append(move)
+        moves.reverse()
+        return moves
+
+    def result(self, status, cost, alignment, states, started):
+        return {
+            'status': status,
+            'cost': cost,
+            'alignment': alignment,
+            'states': states,
+            'seconds': time.perf_counter() - started,
+        }
+
+    # Cost of the cheapest run of the model, i.e. of aligning the empty trace
+    def model_cost(self):
+        if self.empty_cost is None:
+            self.empty_cost = self.align(()).get('cost') or 0
+        return self.empty_cost
+
+    # 1 - cost / worst case cost, where the worst case only uses log moves and model moves
+    def fitness(self, trace, result):
+        if result['cost'] is None:
+            return None
+        worst = len(trace) + self.model_cost()
+        return 1 - result['cost'] / worst if worst else 1.0
+
+
+"""
+Aligns every variant of the log on the model and returns the per variant results together with
+the fitness averaged over the cases that could be aligned, the number of variants that hit a
+limit and the throughput in traces (cases) and variants per second.
+"""
+def align_log(log, model, max_states=100000, timeout=5.0, aligner=None):
+    aligner = aligner or Aligner(model, max_states, timeout)
+    started = time.perf_counter()
+    aligner.model_cost()
+
+    results = {}
+    aligned_cases = 0
+    cases = 0
+    fitness_sum = 0.0
+    failed = 0
+    for trace in all_traces_with_counts(log):
+        count, trace = trace[-1], tuple(trace[:-1])
+        result = aligner.align(trace)
+        results[trace] = result
+        cases += count
+
+        fitness = aligner.fitness(trace, result)
+        if fitness is None:
+            failed += 1
+            continue
+        aligned_cases += count
+        fitness_sum += count * fitness
+
+    elapsed = time.perf_counter() - started
+    return {
+        'alignments': results,
+        'fitness': fitness_sum / aligned_cases if aligned_cases else None,
+        'failed_variants': failed,
+        'seconds': elapsed,
+        'traces_per_second': cases / elapsed if elapsed else float('inf'),
+        'variants_per_second': len(results) / elapsed if elapsed else float('inf'),
+    }
@@ -0,0 +1,164 @@
+import argparse
+import json
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+from generator import generate_log
+from index import *
+
+STAGES = ('read_from_file', 'dependency_graph', 'relation_matrix', 'get_casual_pairs', 'alpha', 'fitness_token_replay')
+
+
+# Returns the result of fn() together with its best wall clock time over repeat runs
+def timed(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def peak_memory(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+"""
+Times every stage of the mining pipeline on one generated log.
+Each stage gets the output of the previous one, times are the best of repeat runs and the
+peak memory is measured in a separate run under tracemalloc (skipped with memory=False).
+The log is replayed on the net mined from model_filename (by default the log itself): alpha can
+not mine a noisy log into a net that has a transition for every activity, so the replay of a
+noisy log is measured against the net of a noise free log of the same process model.
+A stage that raises a ValueError is reported with its error instead of a time.
+"""
+def benchmark_log(filename, repeat=3, memory=True, replay_mode='serial', model_filename=None):
+    log, graph, matrix = None, None, None
+    model = alpha(read_from_file(model_filename or filename))
+
+    def read():
+        return read_from_file(filename)
+
+    stages = {
+        'read_from_file': read,
+        'dependency_graph': lambda: dependency_graph(log),
+        'relation_matrix': lambda: relation_matrix(graph),
+        'get_casual_pairs': lambda: get_casual_pairs(matrix),
+        'alpha': lambda: alpha(log),
+        'fitness_token_replay': lambda: fitness_token_replay(log, model, mode=replay_mode),
+    }
+
+    results = {}
+    for stage in STAGES:
+        try:
+            output, seconds = timed(stages[stage], repeat)
+        except ValueError as e:
+            # e.g. a noisy log with activities the mined net has no transition for
+            results[stage] = {'error': str(e)}
+            continue
+        results[stage] = {'seconds': seconds}
+        if memory:
+            results[stage]['peak_bytes'] = peak_memory(stages[stage])
+
+        if stage == 'read_from_file':
+            log = output
+        elif stage == 'dependency_graph':
+            graph = output
+        elif stage == 'relation_matrix':
+            matrix = output
+        elif stage == 'fitness_token_replay':
+            results[stage]['fitness'] = output
+    return results
+
+
+"""
+Generates a log for every number of cases in the grid (with the same seeded model parameters)
+and benchmarks the pipeline on it. With noise, a noise free log of the same cases is generated
+as well to mine the net the noisy log is replayed on. Returns the JSON serializable report.
+"""
+def run_grid(cases_grid, activities=10, branching=2, concurrency=2, loops=0.0, noise=0.0, seed=0, repeat=3, memory=True, replay_mode='serial'):
+    parameters = {
+        'activities': activities, 'branching': branching, 'concurrency': concurrency,
+        'loops': loops, 'noise': noise, 'seed': seed, 'repeat': repeat, 'replay_mode': replay_mode,
+    }
+    report = {'parameters': parameters, 'python': platform.python_version(), 'runs': {}}
+
+    with tempfile.TemporaryDirectory() as directory:
+        for cases in cases_grid:
+            filename = os.path.join(directory, f'log-{cases}.xes')
+            events = generate_log(filename, cases, activities, branching, concurrency, loops, noise, seed)
+            model_filename = None
+            if noise:
+                model_filename = os.path.join(directory, f'model-{cases}.xes')
+                generate_log(model_filename, cases, activities, branching, concurrency, loops, 0.0, seed)
+            run = benchmark_log(filename, repeat, memory, replay_mode, model_filename)
+            report['runs'][str(cases)] = {'events': events, 'stages': run}
+    return report
+
+
+METRICS = ('seconds', 'peak_bytes')
+
+"""
+Compares the stage times and peak memory of report against baseline and returns the regressions,
+i.e. the metrics of a stage that grew by more than threshold (0.2 means 20 %),
+as (cases, stage, metric, baseline, current).
+"""
+def find_regressions(report, baseline, threshold=0.2):
+    regressions = []
+    for cases, run in report['runs'].items():
+        baseline_run = baseline.get('runs', {}).get(cases)
+        if baseline_run is None:
+            continue
+        for stage, result in run['stages'].items():
+            for metric in METRICS:
+                before = baseline_run['stages'].get(stage, {}).get(metric)
+                if before and metric in result and result[metric] > before * (1 + threshold):
+                    regressions.append((cases, stage, metric, before, result[metric]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the alpha miner and token replay on synthetic logs.")
+    parser.add_argument('--cases', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--activities', type=int, default=10)
+    parser.add_argument('--branching', type=int, default=2)
+    parser.add_argument('--concurrency', type=int, default=2)
+    parser.add_argument('--loops', type=float, default=0.0)
+    parser.add_argument('--noise', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--replay-mode', default='serial')
+    parser.add_argument('--no-memory', action='store_true', help="skip the tracemalloc peak memory runs")
+    parser.add_argument('--baseline', help="JSON baseline to compare against")
+    parser.add_argument('--update', action='store_true', help="write the results as the new baseline")
+    parser.add_argument('--threshold', type=float, default=0.2, help="allowed growth of a stage's time or peak memory before it is flagged")
+    args = parser.parse_args()
+
+    report = run_grid(args.cases, args.activities, args.branching, args.concurrency, args.loops, args.noise,
+                      args.seed, args.repeat, not args.no_memory, args.replay_mode)
+    print(dumps(report, indent=4))
+
+    regressions = []
+    if args.baseline and os.path.exists(args.baseline) and not args.update:
+        with open(args.baseline) as f:
+            regressions = find_regressions(report, json.load(f), args.threshold)
+        for cases, stage, metric, before, after in regressions:
+            print(f"REGRESSION {stage} {metric} on {cases} cases: {before:.4f} -> {after:.4f}")
+
+    if args.baseline and args.update:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=4)
+
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,215 @@
+import itertools
+import os
+import random
+import tempfile
+import numpy as np
+from index import *
+from places import maximal_pairs
+from completion import ShortestCompletion
+from parallelparse import read_event_log_parallel, read_parallel
+from fastparse import read_event_log_fast, read_fast
+from eventlog import NO_TIMESTAMP, to_microseconds
+from timestamps import parse_timestamps
+from generator import generate_log
+from alignments import Aligner
+
+# Consistency checks of the optimized code paths against the serial ones, run with `python check.py`
+LOGS = ("extension-log-4.xes", "extension-log-noisy-4.xes")
+
+
+# The batch replay over the marking matrix gives the fitness of the serial replay, also on a VariantLog
+def check_batch_replay():
+    model = alpha(read_from_file(LOGS[0]))
+    for filename in LOGS:
+        log = read_from_file(filename)
+        expected = fitness_token_replay(log, model)
+        assert fitness_token_replay(log, model, mode='batch') == expected
+        assert fitness_token_replay(VariantLog.from_dict(log), model, mode='batch') == expected
+
+
+# Replaying in a process pool gives the fitness of the serial replay in every mode
+def check_parallel_replay():
+    model = alpha(read_from_file(LOGS[0]))
+    for filename in LOGS:
+        log = read_from_file(filename)
+        expected = fitness_token_replay(log, model)
+        for mode in ('serial', 'batch', 'trie', 'cached'):
+            assert fitness_token_replay(log, model, mode=mode, workers=2) == expected, mode
+
+
+# The prefix trie replay gives the fitness of the serial replay, also on a VariantLog
+def check_trie_replay():
+    model = alpha(read_from_file(LOGS[0]))
+    for filename in LOGS:
+        log = read_from_file(filename)
+        expected = fitness_token_replay(log, model)
+        assert fitness_token_replay(log, model, mode='trie') == expected
+        assert fitness_token_replay(VariantLog.from_dict(log), model, mode='trie') == expected
+
+
+# The memoizing replay cache gives the fitness of the serial replay, also when it is reused
+def check_cached_replay():
+    model = alpha(read_from_file(LOGS[0]))
+    for filename in LOGS:
+        log = read_from_file(filename)
+        expected = fitness_token_replay(log, model)
+        assert fitness_token_replay(log, model, mode='cached') == expected
+        assert fitness_token_replay(VariantLog.from_dict(log), model, mode='cached') == expected
+    assert model.replay_cache().stats()['hits'] > 0
+
+
+# The shortest completion gives the same fitness in the trie and worker replays and a failed search is not repeated
+def check_shortest_completion():
+    model = alpha(read_from_file(LOGS[0]))
+    for filename in LOGS:
+        log = read_from_file(filename)
+        expected = fitness_token_replay(log, model, completion='shortest')
+        assert fitness_token_replay(log, model, mode='trie', completion='shortest') == expected
+        assert fitness_token_replay(log, model, workers=2, completion='shortest') == expected
+
+    completion = ShortestCompletion(model, max_states=1)
+    marking = tuple(0 for _ in completion.places)
+    assert completion.find(marking) is None and completion.find(marking) is None
+    assert completion.searches == 1 and completion.reused == 1
+
+
+# maximal_pairs finds exactly the maximal (A, B) pairs of a brute force search
+def check_maximal_pairs(trials=200):
+    def as_sets(pairs):
+        return {tuple(frozenset(side if isinstance(side, tuple) else (side,)) for side in pair) for pair in pairs}
+
+    rng = random.Random(0)
+    for _ in range(trials):
+        activities = [f"t{i}" for i in range(rng.randint(2, 8))]
+        graph = {}
+        for a in activities:
+            for b in activities:
+                if rng.random() < 0.3:
+                    graph.setdefault(a, {})[b] = 1
+        relations = relation_matrix(graph)
+
+        usable = [a for a in relations if relations[a][a] == 'choice']
+        cliques = [c for r in range(1, len(usable) + 1) for c in itertools.combinations(usable, r)
+                   if all(relations[a][b] == 'choice' for a in c for b in c)]
+        candidates = [(A, B) for A in cliques for B in cliques if all(relations[a][b] == 'direct' for a in A for b in B)]
+        expected = {(frozenset(A), frozenset(B)) for A, B in candidates
+                    if not any(set(A) <= set(A2) and set(B) <= set(B2) and (A, B) != (A2, B2) for A2, B2 in candidates)}
+        assert as_sets(maximal_pairs(relations)[0]) == expected, graph
+
+
+# a -> x_i -> b with the x_i in choice relation used to explore every subset of the choice block
+def check_wide_choice(width=60):
+    graph = {'a': {f"x{i}": 1 for i in range(width)}}
+    for i in range(width):
+        graph[f"x{i}"] = {'b': 1}
+
+    pairs, stats = maximal_pairs(relation_matrix(graph))
+    block = tuple(sorted(f"x{i}" for i in range(width)))
+    assert pairs == {('a', block), (block, 'b')}, pairs
+    assert stats['explored'] <= 10 * width, stats
+
+
+# The compressed logs mine the same net as the dictionary log and replay with the same fitness
+def check_discovery():
+    for filename in LOGS:
+        log = read_from_file(filename)
+        expected = alpha(log)
+        for compressed in (EventLog.from_dict(log), VariantLog.from_dict(log)):
+            model = alpha(compressed)
+            assert model.places == expected.places, type(compressed)
+            assert {id: (t['name'], set(t['input']), set(t['output'])) for id, t in model.transitions.items()} == \
+                {id: (t['name'], set(t['input']), set(t['output'])) for id, t in expected.transitions.items()}, type(compressed)
+            assert dependency_graph(compressed) == dependency_graph(log)
+        assert fitness_token_replay(VariantLog.from_dict(log), expected) == fitness_token_replay(log, expected)
+
+
+# A net rebuilt from its compiled form replays like the mined one
+def check_compiled_round_trip():
+    log = read_from_file("extension-log-4.xes")
+    log_noisy = read_from_file("extension-log-noisy-4.xes")
+    model = alpha(log)
+    rebuilt = alpha(log, compiled=True).to_petri_net()
+    assert rebuilt.produced == model.produced
+    assert fitness_token_replay(log_noisy, rebuilt) == fitness_token_replay(log_noisy, model)
+
+
+def same_event_log(a, b):
+    return (a.activities == b.activities and a.case_ids == b.case_ids
+            and all(np.array_equal(getattr(a, name), getattr(b, name)) for name in ('activity_codes', 'case_offsets', 'timestamps')))
+
+
+# The parallel readers give what read_from_file (or EventLog.from_cases over iter_traces) gives
+def check_parallel_readers():
+    for filename in LOGS:
+        assert read_parallel(filename, workers=2) == read_from_file(filename)
+        for attributes in ({'concept:name'}, CACHED_ATTRIBUTES):
+            assert read_parallel(filename, attributes, workers=2) == read_from_file(filename, attributes), attributes
+        assert same_event_log(read_event_log_parallel(filename, workers=2), EventLog.from_cases(iter_traces(filename, CACHED_ATTRIBUTES)))
+
+
+# The regex fast path gives what read_from_file (or EventLog.from_cases over iter_traces) gives
+def check_fast_readers():
+    for filename in LOGS:
+        for attributes in ({'concept:name'}, CACHED_ATTRIBUTES):
+            assert read_fast(filename, attributes) == read_from_file(filename, attributes), attributes
+        event_log = read_event_log_fast(filename)
+        assert same_event_log(event_log, EventLog.from_cases(iter_traces(filename, CACHED_ATTRIBUTES)))
+        assert event_log.to_dict() == read_from_file(filename, CACHED_ATTRIBUTES)
+
+
+# The bulk timestamp parser gives the UTC microseconds of parse_timestamp and read_event_log creates no datetime
+def check_bulk_timestamps():
+    values = ['2020-01-01T01:00:00+01:00', '2020-01-01T00:00:00Z', '2020-01-01T00:00:00.1234567-05:30',
+              '2020-01-01 00:00', '2020-01-01T00:00:00', '2020-W01-1']
+    expected = [to_microseconds(parse_timestamp(value)) for value in values] + [NO_TIMESTAMP]
+    assert parse_timestamps(values + [None]).tolist() == expected
+
+    with tempfile.TemporaryDirectory() as directory:
+        for filename in LOGS:
+            parse_timestamp.cache_clear()
+            event_log = read_event_log(filename, cache_dir=directory)
+            assert parse_timestamp.cache_info().misses == 0
+            assert same_event_log(event_log, EventLog.from_cases(iter_traces(filename, CACHED_ATTRIBUTES)))
+
+
+# The binary log cache (.xescache/, ignored by git) keeps the attributes projection
+def check_cached_projection():
+    for attributes in ({'concept:name'}, {'time:timestamp'}, CACHED_ATTRIBUTES):
+        expected = read_from_file("extension-log-4.xes", attributes)
+        assert read_from_file("extension-log-4.xes", attributes, cache=True) == expected, attributes
+
+
+# The marking equation heuristic keeps the optimal alignment costs and explores fewer states than h = 0
+def check_alignment_heuristic():
+    model = alpha(read_from_file(LOGS[0]))
+    informed, blind = Aligner(model), Aligner(model, heuristic=False)
+    informed_states, blind_states = 0, 0
+    for trace in all_traces_with_counts(read_from_file(LOGS[1])):
+        trace = tuple(trace[:-1])
+        expected = blind.align(trace)
+        result = informed.align(trace)
+        assert result['status'] == expected['status'] == 'optimal' and result['cost'] == expected['cost'], trace
+        informed_states += result['states']
+        blind_states += expected['states']
+    assert informed_states < blind_states, (informed_states, blind_states)
+
+
+# The net mined from a noise free generated log replays it perfectly and can reach end
+def check_generated_models():
+    settings = [(activities, 3, concurrency, loops, seed) for activities in (10, 30) for concurrency in (2, 4)
+                for loops in (0.0, 0.5) for seed in range(3)]
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'log.xes')
+        for activities, branching, concurrency, loops, seed in settings:
+            generate_log(filename, 200, activities, branching, concurrency, loops, 0.0, seed)
+            log = read_from_file(filename)
+            assert fitness_token_replay(log, alpha(log)) == 1.0, (activities, branching, concurrency, loops, seed)
+            report = alpha(log, compiled=True).state_space().report()
+            assert report['complete'] and report['end_reachable'] and not report['dead_transitions'], (activities, branching, concurrency, loops, seed)
+
+
+if __name__ == '__main__':
+    for name, check in list(globals().items()):
+        if name.startswith('check_'):
+            check()
+            print(f"{name}: ok")
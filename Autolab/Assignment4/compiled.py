@@ -0,0 +1,106 @@
+import numpy as np
+from statespace import explore
+
+
+"""
+Frozen, integer indexed form of a PetriNet.
+Places and transitions are numbered and the arcs are stored as incidence matrices:
+    pre[p, t]  -> tokens transition t consumes from place p
+    post[p, t] -> tokens transition t produces in place p
+A marking is an int vector over the places, so a transition is enabled when
+(marking >= pre[:, t]).all() and firing it is marking + post[:, t] - pre[:, t].
+"""
+class CompiledPetriNet():
+    def __init__(self, places, transitions, names, pre, post, initial_marking):
+        self.places = list(places) # place index -> place id
+        self.transitions = list(transitions) # transition index -> transition id
+        self.names = list(names) # transition index -> transition name
+        self.place_index = {place: p for p, place in enumerate(self.places)}
+        self.transition_index = {transition: t for t, transition in enumerate(self.transitions)}
+        self.name_index = {}
+        for t, name in enumerate(self.names):
+            self.name_index.setdefault(name, t)
+        self.pre = pre
+        self.post = post
+        self.effect = post - pre
+        self.initial_marking = initial_marking
+        self.marking = initial_marking.copy()
+
+    @classmethod
+    def from_petri_net(cls, petri_net):
+        places = list(petri_net.places)
+        transitions = list(petri_net.transitions)
+        place_index = {place: p for p, place in enumerate(places)}
+
+        pre = np.zeros((len(places), len(transitions)), dtype=np.int32)
+        post = np.zeros((len(places), len(transitions)), dtype=np.int32)
+        for t, transition in enumerate(transitions):
+            for place in petri_net.transitions[transition]['input']:
+                pre[place_index[place], t] += 1
+            for place in petri_net.transitions[transition]['output']:
+                post[place_index[place], t] += 1
+
+        marking = np.array([petri_net.places[place] for place in places], dtype=np.int32)
+        names = [petri_net.transitions[transition]['name'] for transition in transitions]
+        return cls(places, transitions, names, pre, post, marking)
+
+    # Builds a mutable PetriNet with the same places, transitions, arcs and initial marking
+    def to_petri_net(self):
+        from index import PetriNet
+
+        p = PetriNet()
+        for place in self.places:
+            p.add_place(place)
+        for t, transition in enumerate(self.transitions):
+            p.add_transition(self.names[t], transition)
+            for place in np.flatnonzero(self.pre[:, t]):
+                p.add_edge(self.places[place], transition)
+            for place in np.flatnonzero(self.post[:, t]):
+                p.add_edge(transition, self.places[place])
+        # add_marking also counts the initial tokens as produced, like build_petri_net does for 'start'
+        for place, tokens in zip(self.places, self.initial_marking.tolist()):
+            for _ in range(tokens):
+                p.add_marking(place)
+        return p
+
+    def number_of_places(self):
+        return len(self.places)
+
+    def number_of_transitions(self):
+        return len(self.transitions)
+
+    def transition_name_to_index(self, name):
+        return self.name_index.get(name)
+
+    def get_tokens(self, place):
+        return int(self.marking[self.place_index[place]])
+
+    def is_enabled(self, t, marking=None):
+        marking = self.marking if marking is None else marking
+        return bool((marking >= self.pre[:, t]).all())
+
+    # Indexes of all transitions enabled in the marking
+    def enabled_transitions(self, marking=None):
+        marking = self.marking if marking is None else marking
+        return np.flatnonzero((marking[:, None] >= self.pre).all(axis=0))
+
+    """
+    Fires transition index t on the current marking.
+    With forced=True missing input tokens are created first, as PetriNet.fire_transition does.
+    Returns the number of missing tokens that had to be created.
+    """
+    def fire_transition(self, t, forced=False):
+        missing = np.maximum(self.pre[:, t] - self.marking, 0)
+        if missing.any():
+            if not forced:
+                raise ValueError(f"Transition {self.transitions[t]} is not enabled and cannot fire.")
+            self.marking += missing
+        self.marking += self.effect[:, t]
+        return int(missing.sum())
+
+    def reset(self):
+        self.marking = self.initial_marking.copy()
+
+    # Reachability / coverability graph from the initial marking, see statespace.py
+    def state_space(self, max_states=100000, max_seconds=None):
+        return explore(self, max_states, max_seconds)
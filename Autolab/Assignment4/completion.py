@@ -0,0 +1,127 @@
+import heapq
+from collections import OrderedDict
+
+
+"""
+Finds the cheapest way to bring a marking of a PetriNet to a marking with a token in 'end'.
+Dijkstra over the markings, where firing a transition costs (tokens it is missing, 1), so a sequence
+that needs fewer forced tokens always wins and ties are broken by the number of firings.
+Once a path is found it is stored for the start marking and for every marking along it (their
+suffixes are shortest paths as well), so later traces that end in the same state reuse it.
+The search gives up after max_states markings and then returns None, which is stored for the
+marking as well, so the failed search is not repeated. At most max_paths markings are kept,
+the least recently used ones are evicted first.
+"""
+class ShortestCompletion():
+    def __init__(self, model, max_states=10000, max_paths=100000):
+        self.places = list(model.places)
+        self.end = self.places.index('end')
+        place_index = {place: p for p, place in enumerate(self.places)}
+        # transition -> (input place indexes, output place indexes)
+        self.arcs = {
+            transition: ([place_index[place] for place in value['input']], [place_index[place] for place in value['output']])
+            for transition, value in model.transitions.items()
+        }
+        self.max_states = max_states
+        self.max_paths = max_paths
+        self.paths = OrderedDict() # marking -> list of transitions that reaches 'end' (None: no path found)
+        self.searches = 0
+        self.reused = 0
+        self.evictions = 0
+
+    def marking_of(self, model):
+        return tuple(model.places[place] for place in self.places)
+
+    def fire(self, marking, inputs, outputs):
+        tokens = list(marking)
+        missing = 0
+        for p in inputs:
+            if tokens[p] == 0:
+                missing += 1
+            else:
+                tokens[p] -= 1
+        for p in outputs:
+            tokens[p] += 1
+        return tuple(tokens), missing
+
+    def find(self, marking):
+        if marking in self.paths:
+            self.reused += 1
+            self.paths.move_to_end(marking)
+            return self.paths[marking]
+
+        self.searches += 1
+        best = {marking: (0, 0)}
+        previous = {} # marking -> (previous marking, transition)
+        queue = [(0, 0, 0, marking)]
+        counter = 0
+        while queue:
+            missing, firings, _, current = heapq.heappop(queue)
+            if best.get(current, (missing, firings)) < (missing, firings):
+                continue
+
+            if current[self.end] > 0:
+                path = self.path_to(previous, current, marking)
+                return self.remember(marking, path)
+
+            if len(best) > self.max_states:
+                return self.store(marking, None)
+
+            for transition, (inputs, outputs) in self.arcs.items():
+                following, lacking = self.fire(current, inputs, outputs)
+                cost = (missing + lacking, firings + 1)
+                if following not in best or cost < best[following]:
+                    best[following] = cost
+                    previous[following] = (current, transition)
+                    counter += 1
+                    heapq.heappush(queue, (cost[0], cost[1], counter, following))
+
+        return self.store(marking, None)
+
+    # Walks the search tree back from target to start
+    def path_to(self, previous, target, start):
+        path = []
+        current = target
+        while current != start:
+            current, transition = previous[current]
+            path.append(transition)
+        path.reverse()
+        return path
+
+    def remember(self, marking, path):
+        current = marking
+        for i, transition in enumerate(path):
+            if current not in self.paths:
+                self.store(current, path[i:])
+            current, _ = self.fire(current, *self.arcs[transition])
+        if current not in self.paths:
+            self.store(current, [])
+        return path
+
+    def store(self, marking, path):
+        self.paths[marking] = path
+        self.paths.move_to_end(marking)
+        if len(self.paths) > self.max_paths:
+            self.paths.popitem(last=False)
+            self.evictions += 1
+        return path
+
+
+"""
+Completes a replayed trace along the cheapest firing sequence to 'end' instead of fire_next_transition.
+The firings are counted like the trace's own forced firings, the token in 'end' is consumed and the
+tokens left anywhere in the net are reported as remaining. Returns (Ci, Pi, Mi, Ri).
+"""
+def complete_shortest(model, completion):
+    path = completion.find(completion.marking_of(model))
+    if path is None:
+        # No completion within the search budget, the token in 'end' is missing
+        model.missing += 1
+        model.places['end'] += 1
+    else:
+        for transition in path:
+            model.fire_transition(transition, forced=True)
+
+    model.remove_marking('end')
+    remaining = sum(model.places.values())
+    return (model.consumed, model.produced, model.missing, remaining)
@@ -0,0 +1,73 @@
+import numpy as np
+
+
+"""
+Counts every directly-follows pair of an integer coded log in one bincount pass.
+activity_codes holds the events of all cases back to back and case_offsets[c] is the position of the
+first event of case c, pairs whose second event starts a new case are masked out.
+Returns the |A|x|A| count matrix together with the start and end activity histograms.
+case_weights optionally gives the number of times every case occurs (e.g. variant counts).
+"""
+def directly_follows_matrix(activity_codes, case_offsets, number_of_activities, case_weights=None):
+    codes = np.asarray(activity_codes, dtype=np.int64)
+    offsets = np.asarray(case_offsets, dtype=np.int64)
+    n = number_of_activities
+    lengths = np.diff(offsets)
+
+    # A pair (i, i + 1) crosses a case boundary when i is the last event of a case
+    mask = np.ones(max(len(codes) - 1, 0), dtype=bool)
+    last_events = offsets[1:-1] - 1
+    mask[last_events[(last_events >= 0) & (last_events < len(mask))]] = False
+
+    pairs = codes[:-1][mask] * n + codes[1:][mask]
+
+    # Empty cases have neither a start nor an end activity
+    non_empty = lengths > 0
+    first = codes[offsets[:-1][non_empty]]
+    last = codes[offsets[1:][non_empty] - 1]
+
+    if case_weights is None:
+        matrix = np.bincount(pairs, minlength=n * n).reshape(n, n)
+        start = np.bincount(first, minlength=n)
+        end = np.bincount(last, minlength=n)
+        return matrix, start, end
+
+    weights = np.asarray(case_weights, dtype=np.int64)
+    event_weights = np.repeat(weights, lengths)[:-1][mask]
+    matrix = np.bincount(pairs, weights=event_weights, minlength=n * n).astype(np.int64).reshape(n, n)
+    start = np.bincount(first, weights=weights[non_empty], minlength=n).astype(np.int64)
+    end = np.bincount(last, weights=weights[non_empty], minlength=n).astype(np.int64)
+    return matrix, start, end
+
+
+class DirectlyFollows():
+    def __init__(self, activities, matrix, start, end):
+        self.activities = list(activities) # code -> activity name
+        self.matrix = matrix # matrix[a][b] -> number of times b directly follows a
+        self.start = start # start[a] -> number of cases starting with a
+        self.end = end # end[a] -> number of cases ending with a
+
+    @classmethod
+    def from_event_log(cls, log):
+        return cls(log.activities, *directly_follows_matrix(log.activity_codes, log.case_offsets, len(log.activities)))
+
+    # Builds the counts from a list of integer coded traces, e.g. [(0, 1, 2), (0, 2, 1)], optionally with their counts
+    @classmethod
+    def from_sequences(cls, sequences, activities, counts=None):
+        offsets = np.zeros(len(sequences) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(sequence) for sequence in sequences])
+        codes = np.fromiter((code for sequence in sequences for code in sequence), dtype=np.int64, count=offsets[-1])
+        return cls(activities, *directly_follows_matrix(codes, offsets, len(activities), counts))
+
+    # Same nested dictionary as dependency_graph, only pairs that occur at least once are kept
+    def to_dict(self):
+        df = {}
+        for task, next_task in zip(*np.nonzero(self.matrix)):
+            df.setdefault(self.activities[task], {})[self.activities[next_task]] = int(self.matrix[task, next_task])
+        return df
+
+    def start_activities(self):
+        return {self.activities[code] for code in np.flatnonzero(self.start)}
+
+    def end_activities(self):
+        return {self.activities[code] for code in np.flatnonzero(self.end)}
@@ -0,0 +1,204 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+import numpy as np
+from directlyfollows import DirectlyFollows
+
+EPOCH = datetime(1970, 1, 1)
+
+# Timestamp value stored for events that have no time:timestamp attribute
+NO_TIMESTAMP = np.iinfo(np.int64).min
+
+
+"""
+Columnar representation of an event log.
+Activity names are interned into an integer vocabulary and every event is stored as a
+position in three flat arrays instead of a dictionary:
+    activity_codes[i]  -> code of the i-th event (index into activities)
+    timestamps[i]      -> time:timestamp of the i-th event in microseconds since the epoch
+    case_offsets[c]    -> position of the first event of case c, the case ends at case_offsets[c + 1]
+"""
+class EventLog():
+    def __init__(self, activities, activity_codes, case_offsets, timestamps, case_ids):
+        self.activities = list(activities) # code -> activity name
+        self.activity_index = {name: code for code, name in enumerate(self.activities)} # activity name -> code
+        self.activity_codes = np.asarray(activity_codes, dtype=np.int32)
+        self.case_offsets = np.asarray(case_offsets, dtype=np.int64)
+        self.timestamps = np.asarray(timestamps, dtype=np.int64)
+        self.case_ids = list(case_ids)
+
+    @classmethod
+    def from_dict(cls, log_data, transition_name='concept:name'):
+        return cls.from_cases(log_data.items(), transition_name)
+
+    """
+    Builds the log from any iterable of (case_id, events) pairs, e.g. the iter_traces generator,
+    without keeping the event dictionaries around.
+    With parse_timestamps the time:timestamp values are collected as they are and converted in one
+    call to parse_timestamps(values) -> int64 microseconds (e.g. raw strings, see read_event_log).
+    """
+    @classmethod
+    def from_cases(cls, cases, transition_name='concept:name', parse_timestamps=None):
+        activity_index = {}
+        activity_codes = []
+        timestamps = []
+        case_offsets = [0]
+        case_ids = []
+
+        for case_id, events in cases:
+            for event in events:
+                name = event[transition_name]
+                code = activity_index.get(name)
+                if code is None:
+                    code = activity_index[name] = len(activity_index)
+                activity_codes.append(code)
+                timestamp = event.get('time:timestamp')
+                timestamps.append(to_microseconds(timestamp) if parse_timestamps is None else timestamp)
+
+            case_offsets.append(len(activity_codes))
+            case_ids.append(case_id)
+
+        if parse_timestamps is not None:
+            timestamps = parse_timestamps(timestamps)
+        return cls(activity_index, activity_codes, case_offsets, timestamps, case_ids)
+
+    """
+    Converts the log back to the dictionary of lists format returned by read_from_file.
+    Only concept:name and time:timestamp are kept in the columnar form, so other attributes are not restored.
+    When attributes is given only those of the two are kept, like the projection of read_from_file.
+    """
+    def to_dict(self, transition_name='concept:name', attributes=None):
+        keep_name = attributes is None or transition_name in attributes
+        keep_timestamp = attributes is None or 'time:timestamp' in attributes
+
+        log_data = {}
+        codes = self.activity_codes.tolist()
+        timestamps = self.datetimes() if keep_timestamp else [None] * len(codes)
+        offsets = self.case_offsets.tolist()
+
+        for c, case_id in enumerate(self.case_ids):
+            events = []
+            for i in range(offsets[c], offsets[c + 1]):
+                event = {transition_name: self.activities[codes[i]]} if keep_name else {}
+                if timestamps[i] is not None:
+                    event['time:timestamp'] = timestamps[i]
+                events.append(event)
+            log_data[case_id] = events
+
+        return log_data
+
+    # The timestamps are kept as int64 microseconds, datetime objects are only created here
+    def datetimes(self):
+        return to_datetimes(self.timestamps)
+
+    def __len__(self):
+        return len(self.case_ids)
+
+    def number_of_events(self):
+        return len(self.activity_codes)
+
+    def trace(self, case):
+        return self.activity_codes[self.case_offsets[case]:self.case_offsets[case + 1]]
+
+    # Yields every case as a tuple of activity codes
+    def traces(self):
+        codes = self.activity_codes.tolist()
+        offsets = self.case_offsets.tolist()
+        for c in range(len(self.case_ids)):
+            yield tuple(codes[offsets[c]:offsets[c + 1]])
+
+    def unique_activities(self):
+        return {self.activities[code] for code in np.unique(self.activity_codes).tolist()}
+
+    def directly_follows(self):
+        return DirectlyFollows.from_event_log(self)
+
+    # Same nested dictionary as dependency_graph, computed with a single pass over the code array
+    def dependency_graph(self):
+        return self.directly_follows().to_dict()
+
+    def variants(self):
+        return VariantLog.from_event_log(self)
+
+    # Same list of [activity, ..., count] as all_traces_with_counts
+    def traces_with_counts(self):
+        return self.variants().traces_with_counts()
+
+
+"""
+Variant compressed event log: every distinct trace is kept once as a tuple of activity codes,
+together with the number of cases that follow it. Discovery and conformance functions accept it
+in place of a log, so their work grows with the number of variants instead of the number of cases.
+"""
+class VariantLog():
+    def __init__(self, activities, variants, counts):
+        self.activities = list(activities) # code -> activity name
+        self.activity_index = {name: code for code, name in enumerate(self.activities)} # activity name -> code
+        self.variants = list(variants) # tuples of activity codes
+        self.counts = list(counts) # counts[v] -> number of cases following variants[v]
+
+    @classmethod
+    def from_event_log(cls, log):
+        trace_counts = defaultdict(int)
+        for trace in log.traces():
+            trace_counts[trace] += 1
+        return cls(log.activities, trace_counts.keys(), trace_counts.values())
+
+    @classmethod
+    def from_dict(cls, log_data, transition_name='concept:name'):
+        return cls.from_cases(log_data.items(), transition_name)
+
+    # Builds the variants from any iterable of (case_id, events) pairs, e.g. the iter_traces generator
+    @classmethod
+    def from_cases(cls, cases, transition_name='concept:name'):
+        activity_index = {}
+        trace_counts = defaultdict(int)
+        for _, events in cases:
+            trace = []
+            for event in events:
+                name = event[transition_name]
+                code = activity_index.get(name)
+                if code is None:
+                    code = activity_index[name] = len(activity_index)
+                trace.append(code)
+            trace_counts[tuple(trace)] += 1
+        return cls(activity_index, trace_counts.keys(), trace_counts.values())
+
+    def __len__(self):
+        return len(self.variants)
+
+    def number_of_cases(self):
+        return sum(self.counts)
+
+    # Yields (activity names, count) for every variant
+    def named_variants(self):
+        for variant, count in zip(self.variants, self.counts):
+            yield [self.activities[code] for code in variant], count
+
+    def unique_activities(self):
+        return {self.activities[code] for variant in self.variants for code in variant}
+
+    # Directly-follows counts weighted by the variant counts, so they equal the counts of the full log
+    def directly_follows(self):
+        return DirectlyFollows.from_sequences(self.variants, self.activities, self.counts)
+
+    def dependency_graph(self):
+        return self.directly_follows().to_dict()
+
+    # Same list of [activity, ..., count] as all_traces_with_counts
+    def traces_with_counts(self):
+        return [names + [count] for names, count in self.named_variants()]
+
+
+def to_microseconds(timestamp):
+    if timestamp is None:
+        return NO_TIMESTAMP
+    return (timestamp - EPOCH) // timedelta(microseconds=1)
+
+
+def from_microseconds(value):
+    return EPOCH + timedelta(microseconds=value)
+
+
+# Vectorized from_microseconds of an array, None where the value is NO_TIMESTAMP
+def to_datetimes(microseconds):
+    return np.asarray(microseconds, dtype=np.int64).astype('datetime64[us]').tolist()
@@ -0,0 +1,202 @@
+import html
+import mmap
+import os
+import re
+import numpy as np
+from eventlog import EventLog
+from index import CACHED_ATTRIBUTES, XES_TYPES, iter_traces
+from timestamps import parse_timestamps
+
+WINDOW_BYTES = 1 << 24 # 16 MiB of the file are tokenized at a time
+
+# The only tags the fast path looks at: <trace>, <event> and the two attributes discovery needs
+TOKEN = re.compile(
+    rb'<(/?)(trace|event)\s*>'
+    rb'|<(string|date|int|float|boolean|id)\s+key="(concept:name|time:timestamp)"\s+value="([^"]*)"\s*/>'
+)
+
+# Anything the tokenizer cannot read the same way ElementTree does sends the file to the full parser.
+# Every pattern starts with a literal, so each one is a fast scan of the file.
+UNSUPPORTED = tuple(re.compile(pattern) for pattern in (
+    rb'<(?:/(?:string|date|int|float|boolean|id)\s*>' # nested attributes
+    rb'|(?:list|container)\b'
+    rb'|(?:trace|event)(?:\s*/>|\s+\w)' # empty or attributed <trace> and <event>
+    rb'|[A-Za-z_][\w.-]*:' # prefixed namespaces
+    rb'|!(?:--|\[CDATA\[|DOCTYPE))',
+    rb'value="[^"]*"\s+key=', # value before key
+    rb'key="(?:concept:name|time:timestamp)"\s+value="[^"]*"\s+[^/\s]', # extra attributes
+    rb'=[^"]', # single quotes or whitespace around =
+    rb' =',
+))
+
+XES_NAMESPACE_DECLARATION = b'xmlns="http://www.xes-standard.org/"'
+ENCODING_DECLARATION = re.compile(rb'<\?xml[^>]*encoding=["\']([\w.-]+)["\']')
+
+
+"""
+True when the fast tokenizer can read the file: UTF-8, the XES namespace declared as default on
+<log>, self closing attribute elements with key before value in double quotes, and no comments
+(outside the prolog), CDATA, nested attributes or empty <trace/> and <event/> elements.
+"""
+def is_supported(data):
+    declaration = ENCODING_DECLARATION.match(data[:256])
+    if declaration and declaration.group(1).lower() not in (b'utf-8', b'utf8'):
+        return False
+    start = data.find(b'<log')
+    if start < 0 or data.find(XES_NAMESPACE_DECLARATION, start, data.find(b'>', start)) < 0:
+        return False
+    return not any(pattern.search(data, start) for pattern in UNSUPPORTED)
+
+
+# Attribute value as ElementTree returns it: entities resolved and whitespace characters normalized to spaces
+def attribute_value(raw):
+    value = raw.decode('utf-8')
+    if '&' in value:
+        value = html.unescape(value)
+    if '\n' in value or '\t' in value or '\r' in value:
+        value = value.replace('\r\n', ' ').replace('\r', ' ').replace('\n', ' ').replace('\t', ' ')
+    return value
+
+
+"""
+Yields the (case_id, events) pairs of the file like iter_traces(filename, attributes) for a projection
+on CACHED_ATTRIBUTES, but from a memory map tokenized by a single compiled regex that only matches
+the <trace> and <event> tags and the concept:name and time:timestamp attributes, every other element
+is skipped without being built. Decoded values are memoized, so repeated activity names and
+timestamps are decoded once. Files the tokenizer does not support (see is_supported) are read with
+iter_traces instead.
+"""
+def iter_traces_fast(filename, attributes=CACHED_ATTRIBUTES):
+    if not set(attributes) <= CACHED_ATTRIBUTES:
+        raise ValueError(f"The fast reader only extracts {sorted(CACHED_ATTRIBUTES)}.")
+
+    with open(filename, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield from iter_traces(filename, attributes)
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if not is_supported(data):
+                yield from iter_traces(filename, attributes)
+                return
+            yield from tokenize(data, attributes)
+
+
+def tokenize(data, attributes):
+    wanted = {key.encode('utf-8'): key for key in attributes}
+    decoded = {tag.encode('utf-8'): {} for tag in XES_TYPES} # tag -> raw value -> decoded value
+    case_id, events, event = None, None, None
+
+    start = 0
+    while start < len(data):
+        # Windows end right after a </trace>, so no token is cut in two
+        end = len(data) if start + WINDOW_BYTES >= len(data) else data.rfind(b'</trace>', start, start + WINDOW_BYTES)
+        end = len(data) if end < 0 else end + len(b'</trace>')
+
+        for close, element, tag, key, value in TOKEN.findall(data, start, end):
+            if element == b'event':
+                if close:
+                    if events is not None and event is not None:
+                        events.append(event)
+                    event = None
+                else:
+                    event = {}
+            elif element:
+                if close:
+                    if case_id and events is not None:
+                        yield case_id, events
+                    case_id, events = None, None
+                else:
+                    case_id, events = None, []
+            elif event is not None:
+                name = wanted.get(key)
+                if name is not None:
+                    values = decoded[tag]
+                    decoded_value = values.get(value)
+                    if decoded_value is None:
+                        decoded_value = values[value] = XES_TYPES[tag.decode()](attribute_value(value))
+                    event[name] = decoded_value
+            elif events is not None and tag == b'string' and key == b'concept:name':
+                case_id = attribute_value(value)
+        start = end
+
+
+# Fast read_from_file(filename, attributes) for a projection on CACHED_ATTRIBUTES
+def read_fast(filename, attributes=CACHED_ATTRIBUTES):
+    log_data = {}
+    for case_id, events in iter_traces_fast(filename, attributes):
+        log_data[case_id] = events
+    return log_data
+
+
+"""
+Fast read_event_log (without the binary cache): the tokens go straight into the EventLog columns
+and the raw time:timestamp values of every window are parsed in bulk into int64 microseconds
+(see timestamps.py), no datetime is created. Logs the columns can not represent the same way as
+EventLog.from_cases (an event without concept:name or a time:timestamp that is not a <date>) and
+unsupported files take the EventLog.from_cases path.
+"""
+def read_event_log_fast(filename):
+    with open(filename, 'rb') as f:
+        if os.fstat(f.fileno()).st_size > 0:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                log = tokenize_columns(data) if is_supported(data) else None
+                if log is not None:
+                    return log
+    return EventLog.from_cases(iter_traces_fast(filename))
+
+
+def tokenize_columns(data):
+    activity_index = {}
+    names = {tag.encode('utf-8'): {} for tag in XES_TYPES} # tag -> raw value -> activity name
+    activity_codes, timestamps, case_offsets, case_ids = [], [], [0], []
+    case_id, trace, activity, timestamp = None, None, None, None
+    missing = object() # activity of an open event without concept:name
+
+    start = 0
+    while start < len(data):
+        end = len(data) if start + WINDOW_BYTES >= len(data) else data.rfind(b'</trace>', start, start + WINDOW_BYTES)
+        end = len(data) if end < 0 else end + len(b'</trace>')
+        raw_timestamps = []
+
+        for close, element, tag, key, value in TOKEN.findall(data, start, end):
+            if element == b'event':
+                if close:
+                    if trace is not None and activity is not None:
+                        if activity is missing:
+                            return None
+                        trace.append((activity, timestamp))
+                    activity = None
+                else:
+                    activity, timestamp = missing, None
+            elif element:
+                if close:
+                    if case_id and trace is not None:
+                        # Codes are given when a case is kept, in the same order as EventLog.from_cases
+                        for name, raw in trace:
+                            code = activity_index.get(name)
+                            if code is None:
+                                code = activity_index[name] = len(activity_index)
+                            activity_codes.append(code)
+                            raw_timestamps.append(raw)
+                        case_offsets.append(len(activity_codes))
+                        case_ids.append(case_id)
+                    case_id, trace = None, None
+                else:
+                    case_id, trace = None, []
+            elif activity is not None:
+                if key == b'time:timestamp':
+                    if tag != b'date':
+                        return None
+                    timestamp = value
+                else:
+                    decoded = names[tag]
+                    activity = decoded.get(value)
+                    if activity is None:
+                        activity = decoded[value] = XES_TYPES[tag.decode()](attribute_value(value))
+            elif trace is not None and tag == b'string' and key == b'concept:name':
+                case_id = attribute_value(value)
+
+        timestamps.append(parse_timestamps(raw_timestamps, attribute_value))
+        start = end
+
+    return EventLog(activity_index, activity_codes, case_offsets, np.concatenate(timestamps) if timestamps else [], case_ids)
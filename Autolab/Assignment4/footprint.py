@@ -0,0 +1,85 @@
+import numpy as np
+
+# Relation codes stored in the int8 footprint matrix
+CHOICE = 0
+DIRECT = 1
+REVERSE = 2
+PARALLEL = 3
+RELATIONS = ('choice', 'direct', 'reverse', 'parallel') # code -> name used by relation_matrix
+
+
+"""
+Dense, activity indexed footprint (relation matrix) of a log.
+relations[a][b] holds one of the relation codes above and is derived from the directly-follows
+matrix D with elementwise operations:
+    direct = D & ~D.T    reverse = ~D & D.T    parallel = D & D.T    choice = ~D & ~D.T
+"""
+class Footprint():
+    def __init__(self, activities, relations, present=None):
+        self.activities = list(activities) # code -> activity name
+        self.activity_index = {name: code for code, name in enumerate(self.activities)}
+        self.relations = relations
+        # Activities that take part in at least one directly-follows pair, the dict view only contains these
+        self.present = np.ones(len(self.activities), dtype=bool) if present is None else present
+
+    # matrix is a |A|x|A| directly-follows count (or boolean) matrix, e.g. DirectlyFollows.matrix
+    @classmethod
+    def from_matrix(cls, activities, matrix):
+        d = np.asarray(matrix) > 0
+        relations = np.full(d.shape, CHOICE, dtype=np.int8)
+        relations[d & ~d.T] = DIRECT
+        relations[~d & d.T] = REVERSE
+        relations[d & d.T] = PARALLEL
+
+        # relation_matrix marks a self loop as 'reverse', keep the diagonal compatible with it
+        loops = np.diagonal(d)
+        relations[loops, loops] = REVERSE
+
+        present = d.any(axis=0) | d.any(axis=1)
+        return cls(activities, relations, present)
+
+    @classmethod
+    def from_directly_follows(cls, directly_follows):
+        return cls.from_matrix(directly_follows.activities, directly_follows.matrix)
+
+    # Builds the footprint from the nested dictionary returned by dependency_graph
+    @classmethod
+    def from_dependency_graph(cls, dependency_graph):
+        activity_index = {}
+        for task, transitions in dependency_graph.items():
+            activity_index.setdefault(task, len(activity_index))
+            for next_task in transitions:
+                activity_index.setdefault(next_task, len(activity_index))
+
+        d = np.zeros((len(activity_index), len(activity_index)), dtype=bool)
+        for task, transitions in dependency_graph.items():
+            for next_task in transitions:
+                d[activity_index[task], activity_index[next_task]] = True
+
+        return cls.from_matrix(activity_index, d)
+
+    # Builds the footprint back from the nested dictionary returned by relation_matrix
+    @classmethod
+    def from_relation_matrix(cls, relation_matrix):
+        activities = list(relation_matrix)
+        activity_index = {name: code for code, name in enumerate(activities)}
+        relations = np.full((len(activities), len(activities)), CHOICE, dtype=np.int8)
+        for a, row in relation_matrix.items():
+            for b, relation in row.items():
+                relations[activity_index[a], activity_index[b]] = RELATIONS.index(relation)
+        return cls(activities, relations)
+
+    def relation(self, a, b):
+        return RELATIONS[self.relations[self.activity_index[a], self.activity_index[b]]]
+
+    def mask(self, relation):
+        return self.relations == RELATIONS.index(relation)
+
+    # Same nested dictionary as relation_matrix, used by get_casual_pairs and the JSON dumps
+    def to_dict(self):
+        codes = np.flatnonzero(self.present).tolist()
+        rows = self.relations[np.ix_(codes, codes)].tolist()
+        return {
+            self.activities[a]: {self.activities[b]: RELATIONS[r] for b, r in zip(codes, row)}
+            for a, row in zip(codes, rows)
+        }
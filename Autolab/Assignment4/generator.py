@@ -0,0 +1,137 @@
+import random
+from datetime import datetime, timedelta
+from xml.sax.saxutils import quoteattr
+
+MIN_LOOP = 3 # activities in one pass of a loop body
+
+
+"""
+Seeded generator of synthetic XES logs from a random block structured process model.
+Every trace starts with the first activity and ends with the last one, the activities in between
+are split into consecutive blocks, each block is one of
+ - sequence: a single activity
+ - choice:   one of `branching` activities is picked (exclusive choice)
+ - parallel: `concurrency` activities are executed in a random interleaving
+Consecutive blocks are grouped into loop bodies of at least MIN_LOOP activities per pass. With
+loops > 0 the last block of a body that can loop is its redo part: the body runs the blocks before
+it once and then, with probability `loops` (at most max_repeats - 1 times), the redo block followed
+by them again.
+Only models the alpha algorithm mines into a sound net are generated, i.e. the net of a noise free
+log replays it with fitness 1.0 and can reach `end`: the first and last activity never loop and
+are never parallel (a parallel start or end block would compete for the start token or leave
+several tokens in end), loops shorter than MIN_LOOP are not generated (a a is a self loop,
+a b a b makes a || b), a loop always goes back through its redo block (a body repeated as a whole
+gives its first activity two input places only one of which is marked on entry), the redo block
+and the blocks a loop enters and leaves by are not parallel and two loops are never adjacent
+(the place a loop is left by and the place the next one is entered by would have to be one).
+With probability `noise` a trace gets one random deviation: two events swapped, one event
+removed or one event duplicated.
+"""
+class ProcessModel():
+    def __init__(self, activities=10, branching=2, concurrency=2, loops=0.0, seed=0):
+        self.random = random.Random(seed)
+        self.loops = loops
+        self.blocks = [] # (kind, activity names) between the first and the last activity
+
+        names = [f"activity {i}" for i in range(activities)]
+        first, inner, last = names[:1], names[1:-1], names[1:][-1:]
+        i = 0
+        while i < len(inner):
+            kind = self.random.choice(('sequence', 'choice', 'parallel'))
+            width = {'sequence': 1, 'choice': max(branching, 1), 'parallel': max(concurrency, 1)}[kind]
+            block = inner[i:i + width]
+            self.blocks.append((kind if len(block) > 1 else 'sequence', block))
+            i += width
+
+        # Loop bodies: consecutive blocks that emit at least MIN_LOOP activities per pass,
+        # the blocks left over at the end can not loop and go with the last activity
+        self.bodies = [(False, [('sequence', first)])] # (can loop, blocks)
+        body, length = [], 0
+        for kind, block in self.blocks:
+            body.append((kind, block))
+            length += 1 if kind == 'choice' else len(block)
+            if length >= MIN_LOOP and kind != 'parallel':
+                can_loop = (loops > 0 and len(body) > 1 and body[0][0] != 'parallel' and body[-2][0] != 'parallel'
+                            and not self.bodies[-1][0])
+                self.bodies.append((can_loop, body))
+                body, length = [], 0
+        if last:
+            body.append(('sequence', last))
+        if body:
+            self.bodies.append((False, body))
+
+    def trace(self, max_repeats=3):
+        trace = []
+        for can_loop, body in self.bodies:
+            if not can_loop:
+                self.emit(trace, body)
+                continue
+            body, redo = body[:-1], body[-1:]
+            self.emit(trace, body)
+            repeats = 1
+            while repeats < max_repeats and self.random.random() < self.loops:
+                self.emit(trace, redo)
+                self.emit(trace, body)
+                repeats += 1
+        return trace
+
+    def emit(self, trace, blocks):
+        for kind, block in blocks:
+            if kind == 'choice':
+                trace.append(self.random.choice(block))
+            elif kind == 'parallel':
+                trace.extend(self.random.sample(block, len(block)))
+            else:
+                trace.extend(block)
+
+    def add_noise(self, trace):
+        trace = list(trace)
+        deviation = self.random.choice(('swap', 'remove', 'duplicate'))
+        if deviation == 'swap' and len(trace) > 1:
+            i = self.random.randrange(len(trace) - 1)
+            trace[i], trace[i + 1] = trace[i + 1], trace[i]
+        elif deviation == 'remove' and len(trace) > 1:
+            del trace[self.random.randrange(len(trace))]
+        else:
+            i = self.random.randrange(len(trace))
+            trace.insert(i, trace[i])
+        return trace
+
+
+"""
+Writes a log of `cases` traces of the model to filename in the XES layout of the course logs
+and returns the number of events written. The file is written trace by trace, so large logs
+never have to fit in memory.
+"""
+def write_log(filename, cases, model, noise=0.0, start=datetime(1970, 1, 1)):
+    events = 0
+    with open(filename, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8" ?>\n')
+        f.write('<log xes.version="1.0" xes.features="nested-attributes" xmlns="http://www.xes-standard.org/">\n')
+        f.write('\t<string key="concept:name" value="synthetic-process"/>\n')
+
+        for case in range(cases):
+            trace = model.trace()
+            if model.random.random() < noise:
+                trace = model.add_noise(trace)
+
+            f.write('\t<trace>\n')
+            f.write(f'\t\t<string key="concept:name" value="case_{case}"/>\n')
+            for position, activity in enumerate(trace):
+                timestamp = (start + timedelta(hours=position + 1)).isoformat(timespec='milliseconds')
+                f.write('\t\t<event>\n')
+                f.write(f'\t\t\t<string key="org:resource" value="resource-{model.random.randrange(10)}"/>\n')
+                f.write(f'\t\t\t<int key="cost" value="{model.random.randrange(1000)}"/>\n')
+                f.write(f'\t\t\t<string key="concept:name" value={quoteattr(activity)}/>\n')
+                f.write(f'\t\t\t<date key="time:timestamp" value="{timestamp}+00:00"/>\n')
+                f.write('\t\t</event>\n')
+            f.write('\t</trace>\n')
+            events += len(trace)
+
+        f.write('</log>\n')
+    return events
+
+
+def generate_log(filename, cases=1000, activities=10, branching=2, concurrency=2, loops=0.0, noise=0.0, seed=0):
+    model = ProcessModel(activities, branching, concurrency, loops, seed)
+    return write_log(filename, cases, model, noise)
@@ -0,0 +1,124 @@
+from index import EventLog, VariantLog, build_petri_net, cases, get_casual_pairs, transition_name
+
+
+"""
+Alpha miner that is kept up to date while cases are appended to the log.
+The directly-follows counts, the start/end sets and the relation matrix are updated in place,
+the casual pairs and the PetriNet are only rebuilt when one of them actually changed.
+
+    miner = IncrementalAlpha()
+    miner.add_log(read_from_file("extension-log-4.xes"))
+    flips = miner.add_case(events) # [(a, b, old relation, new relation), ...]
+    model = miner.model()
+"""
+class IncrementalAlpha():
+    def __init__(self):
+        self.df = {} # activity -> {next activity -> count}, same shape as dependency_graph
+        self.matrix = {} # same shape as relation_matrix
+        self.first_occuring_transitions = set()
+        self.last_occuring_transitions = set()
+        self.number_of_cases = 0
+        self.casual_pairs = None
+        self.petri_net = None
+        self.changed = True # the model has to be rebuilt before it is returned
+        self.rebuilds = 0
+
+    """
+    Adds one case, given as the list of event dictionaries of read_from_file.
+    Returns the relations of the footprint that flipped, as (a, b, old, new) tuples,
+    activities seen for the first time start in 'choice' relation with everything else.
+    """
+    def add_case(self, events):
+        return self.add_trace([event[transition_name] for event in events])
+
+    # trace is a list of activity names, count the number of cases that follow it
+    def add_trace(self, trace, count=1):
+        self.number_of_cases += count
+        flips = []
+        if not trace:
+            return flips
+
+        if trace[0] not in self.first_occuring_transitions:
+            self.first_occuring_transitions.add(trace[0])
+            self.changed = True
+        if trace[-1] not in self.last_occuring_transitions:
+            self.last_occuring_transitions.add(trace[-1])
+            self.changed = True
+
+        for i in range(len(trace) - 1):
+            task, next_task = trace[i], trace[i + 1]
+            followers = self.df.setdefault(task, {})
+            if next_task in followers:
+                followers[next_task] += count
+                continue
+
+            # Only an edge that was never seen before can change the footprint
+            followers[next_task] = count
+            flips.extend(self.add_relation(task, next_task))
+
+        if flips:
+            self.changed = True
+        return flips
+
+    def add_log(self, log):
+        flips = []
+        if isinstance(log, VariantLog):
+            for trace, count in log.named_variants():
+                flips.extend(self.add_trace(trace, count))
+            return flips
+
+        if isinstance(log, EventLog):
+            for trace in log.traces():
+                flips.extend(self.add_trace([log.activities[code] for code in trace]))
+            return flips
+
+        for _, events in cases(log):
+            flips.extend(self.add_case(events))
+        return flips
+
+    def add_relation(self, task, next_task):
+        for activity in (task, next_task):
+            if activity not in self.matrix:
+                # A new activity is in choice relation with everything in the footprint
+                self.matrix[activity] = {other: 'choice' for other in self.matrix}
+                for other in self.matrix:
+                    self.matrix[other][activity] = 'choice'
+
+        flips = []
+        for a, b in ((task, next_task), (next_task, task)):
+            old = self.matrix[a].get(b)
+            new = self.relation(a, b)
+            if old != new:
+                self.matrix[a][b] = new
+                flips.append((a, b, old, new))
+        return flips
+
+    # The relation between a and b as relation_matrix derives it from the dependency graph
+    def relation(self, a, b):
+        forward = b in self.df.get(a, {})
+        if a == b:
+            return 'reverse' if forward else 'choice'
+
+        backward = a in self.df.get(b, {})
+        if forward and backward:
+            return 'parallel'
+        if forward:
+            return 'direct'
+        if backward:
+            return 'reverse'
+        return 'choice'
+
+    def dependency_graph(self):
+        return self.df
+
+    def relation_matrix(self):
+        return self.matrix
+
+    # Returns the current model, rebuilding it only if the footprint or the start/end sets changed
+    def model(self):
+        if self.changed or self.petri_net is None:
+            self.casual_pairs = get_casual_pairs(self.matrix)
+            self.petri_net = build_petri_net(self.first_occuring_transitions, self.last_occuring_transitions, self.casual_pairs)
+            self.changed = False
+            self.rebuilds += 1
+        return self.petri_net
@@ -1,7 +1,19 @@
 import xml.etree.ElementTree as ET
-from datetime import datetime, date
+from datetime import datetime, date, timezone
+from functools import lru_cache
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from json import *
+from eventlog import EventLog, VariantLog
+from logcache import read_cached
+from footprint import Footprint
+from places import maximal_pairs
+from compiled import CompiledPetriNet
+from replay import batch_token_replay, fitness, weighted_sums
+from replaycache import ReplayCache
+from completion import ShortestCompletion, complete_shortest
+from profiling import PROFILER
+from timestamps import parse_timestamps
 
 class PetriNet():
     def __init__(self):
@@ -11,28 +23,53 @@ class PetriNet():
         self.consumed = 0 #Placeholder for the end place
         self.produced = 0 
         
+        # Indexes kept up to date by add_place, add_transition and add_edge
+        self.name_to_id = {} # transition name -> first transition_id with that name
+        self.transition_order = {} # transition_id -> position in self.transitions
+        self.consumers = {} # place_id -> set of transitions that have the place as input
+        self.producers = {} # place_id -> set of transitions that have the place as output
+        self.input_places = {} # transition_id -> set of input places
+        self.output_places = {} # transition_id -> set of output places
+        self.cache = None # ReplayCache of the net, dropped whenever the structure changes
+        self.completion = None # ShortestCompletion of the net, dropped together with the cache
+        
     def add_place(self, place):
         if not place in self.places:
             self.places[place] = 0
+            self.cache = None
+            self.completion = None
+            self.consumers[place] = set()
+            self.producers[place] = set()
     
     def add_transition(self, name, id):
         if not id in self.transitions:
             self.transitions[id] = {"name": name, 'input': [], 'output': []}
+            self.cache = None
+            self.completion = None
+            self.name_to_id.setdefault(name, id)
+            self.transition_order[id] = len(self.transition_order)
+            self.input_places[id] = set()
+            self.output_places[id] = set()
         
     def transition_name_to_id(self, name):
-        for id, transition in self.transitions.items():
-            if transition['name'] == name:
-                return id
-        return None 
+        return self.name_to_id.get(name)
 
         
     def add_edge(self, source, target):
         if source in self.places and target in self.transitions:
-            if self.transitions[target]['input'] is None or source not in self.transitions[target]['input']:
+            if source not in self.input_places[target]:
              self.transitions[target]['input'].append(source)
+             self.cache = None
+             self.completion = None
+             self.input_places[target].add(source)
+             self.consumers[source].add(target)
         elif source in self.transitions and target in self.places:
-            if self.transitions[source]['output'] is None or target not in self.transitions[source]['output']:
+            if target not in self.output_places[source]:
              self.transitions[source]['output'].append(target)
+             self.cache = None
+             self.completion = None
+             self.output_places[source].add(target)
+             self.producers[target].add(source)
         return self
         
     def get_tokens(self, place):
@@ -65,6 +102,8 @@ class PetriNet():
         
         # If the transition is forced
         if forced and not self.is_enabled(transition):
+            if PROFILER.enabled:
+                PROFILER.count('forced_firings')
             for place in self.transitions[transition]['input']:
                 if self.get_tokens(place) == 0:
                     # Add a token to the place and update the missing token
@@ -83,18 +122,34 @@ class PetriNet():
             # self.produced += 1
     
     def fire_next_transition(self):
+        if PROFILER.enabled:
+            PROFILER.count('fire_next_transition_iterations')
         next_transition = None
         for place in self.places:
-            if self.get_tokens(place) == 1:
-                for transition in self.transitions:
-                    if place in self.transitions[transition]['input']:
-                        next_transition = transition
-                        break
+            if self.get_tokens(place) == 1 and self.consumers[place]:
+                # First consuming transition in the order the transitions were added
+                next_transition = min(self.consumers[place], key=self.transition_order.get)
                 if next_transition:
                     break
         self.fire_transition(next_transition, forced=True, updateTokens=False)
 
             
+    # Memoizing replay cache attached to the net, see replaycache.py
+    def replay_cache(self, max_entries=100000):
+        if self.cache is None:
+            self.cache = ReplayCache(self, complete_trace, max_entries)
+        return self.cache
+    
+    # Cached shortest path search to the end place, see completion.py
+    def shortest_completion(self, max_states=10000, max_paths=100000):
+        if self.completion is None:
+            self.completion = ShortestCompletion(self, max_states, max_paths)
+        return self.completion
+    
+    # Freezes the net into its integer indexed form with incidence matrices, see compiled.py
+    def compile(self):
+        return CompiledPetriNet.from_petri_net(self)
+    
     def to_dict(self):
         #Convert the object into a dictionary for serialization
         return {
@@ -119,81 +174,193 @@ class PetriNet():
             self.places[place] = 0
         self.add_marking('start')
 
-def read_from_file(filename):
-    log_data = {}
-    
-    # Parse the XES file
-    tree = ET.parse(filename)
-    root = tree.getroot()
-    
-    ns = {'xes': 'http://www.xes-standard.org/'}  # Update based on the file if needed
+XES_NAMESPACE = '{http://www.xes-standard.org/}'
+
+"""
+Decodes an XES date into a naive datetime in UTC: a timestamp with an offset is converted to UTC
+instead of keeping its local time. Logs repeat the same timestamps a lot, so results are memoized.
+"""
+@lru_cache(maxsize=1 << 16)
+def parse_timestamp(value):
+    timestamp = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc)
+    return timestamp.replace(tzinfo=None)
+
+# XES attribute element -> function that decodes its value attribute
+XES_TYPES = {
+    'string': str,
+    'id': str,
+    'int': int,
+    'float': float,
+    'boolean': lambda value: value.lower() == 'true',
+    'date': parse_timestamp,
+}
+
+# Value of a <date> kept as its string, the columnar readers parse them in bulk (see timestamps.py)
+class RawTimestamp(str):
+    pass
+
+RAW_DATES = dict(XES_TYPES, date=RawTimestamp)
+
+# parse_timestamps for the RAW_DATES decoded time:timestamp values of EventLog.from_cases
+def parse_raw_timestamps(values):
+    for value in values:
+        if value is not None and not isinstance(value, RawTimestamp):
+            # Same error as EventLog.from_cases on a time:timestamp that is not a <date>
+            raise TypeError(f"time:timestamp {value!r} is not a date.")
+    return parse_timestamps(values)
+
+"""
+Streams the XES file one trace at a time and yields (case_id, events) pairs.
+Every finished <trace> element is cleared, so memory stays bounded by the largest trace
+instead of the whole document. Traces without a concept:name are skipped.
+When attributes is given, only those event attributes are decoded and kept.
+types maps the attribute elements to their decoders, RAW_DATES keeps the dates as strings.
+"""
+def iter_traces(filename, attributes=None, types=XES_TYPES):
+    context = ET.iterparse(filename, events=('start', 'end'))
+    _, root = next(context)
     
-    # Loop through each trace (representing a case) in the XES file
-    for trace in root.findall('xes:trace', ns):
+    for action, element in context:
+        if action != 'end' or element.tag != XES_NAMESPACE + 'trace':
+            continue
+        
         case_id = None
         events = []
         
-        # Get the trace's case ID (usually in a concept:name attribute)
-        for attr in trace.findall('xes:string', ns):
-            if attr.attrib['key'] == 'concept:name':
-                case_id = attr.attrib['value']
-        
-        # Loop through each event in the trace
-        for event in trace.findall('xes:event', ns):
-            event_data = {}
+        for child in element:
+            # Get the trace's case ID (usually in a concept:name attribute)
+            if child.tag == XES_NAMESPACE + 'string' and child.attrib['key'] == 'concept:name':
+                case_id = child.attrib['value']
             
-            # Extract attributes from the event
-            for attr in event:
-                key = attr.attrib['key']
-                value = attr.attrib['value']
-                
-                # Parse the value based on the type of the attribute key
-                if key == 'cost' or key == 'urgency':
-                    value = int(value)
-                elif key == 'time:timestamp':
-                    # Parse the timestamp into a datetime object
-                    value = datetime.fromisoformat(value.replace('Z', '+00:00')).replace(tzinfo=None)
-                
-                elif key == 'intervention':
-                    value = bool(value)
-                
-                event_data[key] = value
-            
-            events.append(event_data)
+            # Loop through each event in the trace
+            elif child.tag == XES_NAMESPACE + 'event':
+                events.append(parse_event(child, attributes, types))
+        
+        # Drop the finished trace (and the reference the root keeps to it)
+        element.clear()
+        root.clear()
+        PROFILER.count('events_parsed', len(events))
         
         if case_id:
+            yield case_id, events
+
+
+def parse_event(event, attributes=None, types=XES_TYPES):
+    event_data = {}
+    
+    # Extract attributes from the event
+    for attr in event:
+        key = attr.attrib['key']
+        
+        # Skipped attributes are never decoded
+        if attributes is not None and key not in attributes:
+            continue
+        
+        # Parse the value based on the XES element it is stored in (<int>, <date>, <boolean>, ...)
+        decode = types.get(attr.tag.rpartition('}')[2], str)
+        event_data[key] = decode(attr.attrib['value'])
+    
+    return event_data
+
+
+# Attributes kept by the columnar EventLog and therefore by the parsed log cache
+CACHED_ATTRIBUTES = {'concept:name', 'time:timestamp'}
+
+"""
+With cache=True the log is loaded from the binary cache next to the XES file (see logcache.py)
+instead of parsing the XML again. The cache only stores CACHED_ATTRIBUTES, so it has to be combined
+with an attributes projection within that set.
+"""
+def read_from_file(filename, attributes=None, cache=False):
+    if cache:
+        if attributes is None or not set(attributes) <= CACHED_ATTRIBUTES:
+            raise ValueError(f"The parsed log cache only stores {sorted(CACHED_ATTRIBUTES)}.")
+        with PROFILER.timer('read_from_file.cache'):
+            return read_event_log(filename).to_dict(attributes=attributes)
+    
+    log_data = {}
+    
+    with PROFILER.timer('read_from_file.parse'):
+        for case_id, events in iter_traces(filename, attributes):
             log_data[case_id] = events
     
     return log_data
 
 
+# The timestamps go into the columns through the bulk parser, no datetime is created
+def read_event_log(filename, cache_dir=None):
+    def parse(f):
+        return EventLog.from_cases(iter_traces(f, CACHED_ATTRIBUTES, RAW_DATES), parse_timestamps=parse_raw_timestamps)
+    return read_cached(filename, parse, cache_dir=cache_dir)
+
+
 transition_name = 'concept:name'
 
-def alpha(event_logs):
-    p = PetriNet()
+# Log representations that bring their own array based implementation of the discovery steps
+COMPRESSED_LOGS = (EventLog, VariantLog)
+
+"""
+Accepts either the dictionary returned by read_from_file or the (case_id, events)
+generator returned by iter_traces, so single pass steps can run on a streamed log.
+"""
+def cases(event_logs):
+    if isinstance(event_logs, dict):
+        return event_logs.items()
+    return event_logs
+
+"""
+Mines a PetriNet from the log with the alpha algorithm.
+With compiled=True the frozen CompiledPetriNet is returned instead.
+"""
+def alpha(event_logs, compiled=False):
+    # Compressed logs compute the directly-follows counts, start and end activities in one pass
+    if isinstance(event_logs, COMPRESSED_LOGS):
+        with PROFILER.timer('alpha.directly_follows'):
+            directly_follows = event_logs.directly_follows()
+        with PROFILER.timer('alpha.relation_matrix'):
+            footprint = Footprint.from_directly_follows(directly_follows)
+        with PROFILER.timer('alpha.get_casual_pairs'):
+            casusal_relations = get_casual_pairs(footprint)
+        with PROFILER.timer('alpha.build_petri_net'):
+            return build_petri_net(directly_follows.start_activities(), directly_follows.end_activities(), casusal_relations, compiled)
     
     # Lets consider concept:name as the transition name
     
     # Step 1: Find all unique tasks
-    tasks = generate_unique_set(event_logs)
+    with PROFILER.timer('alpha.unique_set'):
+        tasks = generate_unique_set(event_logs)
     
     # Step2: Find the first occuring transitions
-    first_occuring_transitions = generate_first_occuring_transitions(event_logs)
+    with PROFILER.timer('alpha.first_occuring_transitions'):
+        first_occuring_transitions = generate_first_occuring_transitions(event_logs)
     
     # Step3: Find all the last occuring transitions
-    last_occuring_transitions = generate_last_occuring_transitions(event_logs)
+    with PROFILER.timer('alpha.last_occuring_transitions'):
+        last_occuring_transitions = generate_last_occuring_transitions(event_logs)
     
     # Step4
     
     #  Find the dependency graph
-    d_graph = dependency_graph(event_logs)
+    with PROFILER.timer('alpha.dependency_graph'):
+        d_graph = dependency_graph(event_logs)
     
     # Find the relation matrix
-    r_matrix = relation_matrix(d_graph)
+    with PROFILER.timer('alpha.relation_matrix'):
+        r_matrix = relation_matrix(d_graph)
     
     
     # Step4 and step5: Final step: All places in casual relations and not in parallel relations
-    casusal_relations = get_casual_pairs(r_matrix)
+    with PROFILER.timer('alpha.get_casual_pairs'):
+        casusal_relations = get_casual_pairs(r_matrix)
+    
+    with PROFILER.timer('alpha.build_petri_net'):
+        return build_petri_net(first_occuring_transitions, last_occuring_transitions, casusal_relations, compiled)
+
+
+def build_petri_net(first_occuring_transitions, last_occuring_transitions, casusal_relations, compiled=False):
+    p = PetriNet()
     
     # Add input and output places to the petri net
     p.add_place('start')
@@ -253,6 +420,8 @@ def alpha(event_logs):
                 p.add_transition(i, i)
                 p.add_edge(source=place, target=i)
 
+    if compiled:
+        return p.compile()
     return p
 
 
@@ -262,6 +431,9 @@ def place_name(t0, t1):
     
 # Step: 1
 def generate_unique_set(event_logs):
+    if isinstance(event_logs, COMPRESSED_LOGS):
+        return event_logs.unique_activities()
+    
     tasks = set()
     for _, events in event_logs.items():
         for event in events:
@@ -271,6 +443,9 @@ def generate_unique_set(event_logs):
 
 # Step:2 : 
 def generate_first_occuring_transitions(event_logs):    
+    if isinstance(event_logs, COMPRESSED_LOGS):
+        return event_logs.directly_follows().start_activities()
+    
     first_occuring_transitions = set()
     for _, events in event_logs.items():
         first_occuring_transitions.add(events[0][transition_name])
@@ -279,6 +454,9 @@ def generate_first_occuring_transitions(event_logs):
         
 # Step3:
 def generate_last_occuring_transitions(event_logs):
+    if isinstance(event_logs, COMPRESSED_LOGS):
+        return event_logs.directly_follows().end_activities()
+    
     last_occuring_transitions = set()
     for _, events in event_logs.items():
         last_occuring_transitions.add(events[-1][transition_name])
@@ -287,8 +465,11 @@ def generate_last_occuring_transitions(event_logs):
 
  # Step4.1 : Lets first find the dependency graph
 def dependency_graph(event_log):
+    if isinstance(event_log, COMPRESSED_LOGS):
+        return event_log.dependency_graph()
+    
     df = {}
-    for _, events_arr in event_log.items():
+    for _, events_arr in cases(event_log):
         for i in range(len(events_arr)-1):
             event = events_arr[i]
             next_event = events_arr[i+1]
@@ -304,179 +485,35 @@ def dependency_graph(event_log):
     return df
 
 
+"""
+Builds the relation matrix from an activity indexed footprint (see footprint.py), which costs O(|A|^2)
+instead of looping over every pair of directly-follows relations.
+"""
 def relation_matrix(dependency_graph):
-    all_direct_relations = set()
-    
-    # Collect all direct relations from the dependency graph
-    for step, transitions in dependency_graph.items():
-        for transition in transitions:
-            all_direct_relations.add((step, transition))
-    
-    # Initialize the matrix with all relations being 'choice'
-    matrix = {}
-    for t1, t2 in all_direct_relations:
-        # Initialize dictionaries if they do not exist
-        if t1 not in matrix:
-            matrix[t1] = {}
-        if t2 not in matrix:
-            matrix[t2] = {}
-    
-        for t1_, t2_ in all_direct_relations:
-            # Init with choice
-            matrix[t1][t1_] = matrix[t1][t2_] = matrix[t2][t1_] = matrix[t2][t2_] = 'choice'
-    
-    # Set 'direct', 'reverse', and 'parallel' relations based on conditions
-    for t1, t2 in all_direct_relations:
-        if matrix[t2][t1] == 'direct':
-            matrix[t1][t2] = matrix[t2][t1] = 'parallel'
-        else:
-            matrix[t1][t2] = 'direct'
-            matrix[t2][t1] = 'reverse'
-    
-    return matrix
+    return Footprint.from_dependency_graph(dependency_graph).to_dict()
 
 
 
 # Step 4: Find pairs that are in direct relation and not in parallel to itself:
+# Only the maximal pairs are kept, see places.py for the bitset search
 def get_casual_pairs(relation_matrix):
-    result = []
-    
-    for B in relation_matrix:
-        # Collect potential "C" and "D" for simplification
-        for C in relation_matrix[B]:
-            # Check if B has a direct relation to C, and both B and C have "choice" self-relations
-            if (relation_matrix[B][C] == 'direct' and
-                relation_matrix[B][B] == 'choice' and
-                relation_matrix[C][C] == 'choice'):
-                result.append((B, C))
-         
-    possible_multiple_pairs = []
-    
-    for item1, item2 in result:
-        for item1_, item2_ in result:
-            # Skip when the same pair is compared
-            if item1 == item1_ and item2 == item2_:
-                continue
-            
-            if item1 == item1_:
-                if (relation_matrix[item1][item1] == 'choice' and
-                    relation_matrix[item2][item2] == 'choice' and
-                    relation_matrix[item2_][item2_] == 'choice' and
-                    relation_matrix[item2][item2_] == 'choice'):
-                    if ((item1, (item2_, item2)) not in possible_multiple_pairs):
-                        possible_multiple_pairs.append((item1, (item2, item2_)))
-                    
-            if item2 == item2_:
-                if(relation_matrix[item2][item2] == 'choice' and
-                   relation_matrix[item1][item1] == 'choice' and
-                   relation_matrix[item1_][item1_] == 'choice' and
-                   relation_matrix[item1][item1_] == 'choice'):
-                    if (((item1_, item1), item2) not in possible_multiple_pairs):
-                        possible_multiple_pairs.append(((item1, item1_), item2))
-    
-    # At this point we have all possible multiple pairs
-    # Lets remove the redundant pairs
-    copy = set(possible_multiple_pairs.copy())
-        
-    for item1, item2 in possible_multiple_pairs:
-        for item1_, item2_ in possible_multiple_pairs:
-            if item1 == item1_ and item2 == item2_:
-                continue
-                
-            if item2 == item2_: 
-                    # Both not being tuple
-                if not isinstance(item1, tuple) and not isinstance(item1_, tuple):
-                    if not (item1, item2) in copy or not (item1_, item2_) in copy: continue
-                    copy.remove((item1, item2))
-                    copy.remove((item1_, item2_))
-                    copy.add(((item1, item1_), item2))
-                    
-                    # Both being tuple
-                elif isinstance(item1, tuple) and isinstance(item1_, tuple):
-                    if not (item1, item2) in copy or not (item1_, item2_) in copy: continue
-                    copy.remove((item1_, item2_))
-                    tempSet = set()
-                        
-                    for i in item1:
-                        tempSet.add(i)
-                    for i in item1_:
-                        tempSet.add(i)
-                    tempList = list(tempSet)
-                    
-                    copy.add((tuple(tempList), item2))
-                        
-                elif isinstance(item1, tuple) and not isinstance(item1_, tuple):
-                    if not (item1, item2) in copy or not (item1_, item2_) in copy: continue
-                    copy.remove((item1, item2))
-                    copy.remove((item1_, item2_))
-                    tempSet = set()
-                        
-                    for i in item1:
-                        tempSet.add(i)
-                    tempSet.add(item1_)
-                    tempList = list(tempSet)
-                    copy.add((tuple(tempList), item2))
-                        
-                elif not isinstance(item1, tuple) and isinstance(item1_, tuple):
-                    if not (item1, item2) in copy or not (item1_, item2_) in copy: continue
-                    copy.remove((item1, item2))
-                    copy.remove((item1_, item2_))
-                    tempSet = set()
-                        
-                    for i in item1_:
-                        tempSet.add(i)
-                    tempSet.add(item1)
-                    tempList = list(tempSet)
-                    copy.add((tuple(tempList), item2))
-
-    copiedCopy = set(copy.copy())
-
-    for item1, item2 in copy:
-        for item1_, item2_ in copy:
-            if item1 == item1_ and item2 == item2_:
-                continue
-            if item1 == item1_:
-                if (len(item2) > len(item2_)):
-                    if (item1_, item2_) not in copiedCopy: continue
-                    copiedCopy.remove((item1_, item2_))
-                else:
-                    if (item1, item2) not in copiedCopy: continue
-                    copiedCopy.remove((item1, item2))
-            elif item2 == item2_:
-                if (len(item1) > len(item1_)):
-                    if (item1_, item2_) not in copiedCopy: continue
-                    copiedCopy.remove((item1_, item2_))
-                else:
-                    if (item1, item2) not in copiedCopy: continue
-                    copiedCopy.remove((item1, item2))
-
-    copy = copiedCopy
-    
-    
-    resultCopy = set(result.copy())
-    
-    for item1, item2 in result:
-        for item1_, item2_ in copy:
-            if item1 == item1_ and item2 == item2_:
-                continue
-            if item1 == item1_ or item2 == item2_:
-                if (item1, item2) not in resultCopy: continue
-                resultCopy.remove((item1, item2))
-                resultCopy.add((item1_, item2_))
-
-            
-
-    return resultCopy
+    pairs, stats = maximal_pairs(relation_matrix)
+    PROFILER.count('pairs_compared', stats['explored'])
+    PROFILER.count('pairs_pruned', stats['pruned'])
+    return pairs
 
 """
 Returns a list of unique traces in the log, along with the number of times each trace occurs.
 The last element of each trace is the count of the number of times the trace occurs in the log.
 """
 def all_traces_with_counts(data):
+    if isinstance(data, COMPRESSED_LOGS):
+        return data.traces_with_counts()
+    
     trace_counts = defaultdict(int)
     
     # Iterate over each case in the dataset
-    for _, events in data.items():
+    for _, events in cases(data):
         trace = tuple(event['concept:name'] for event in events)
         trace_counts[trace] += 1
 
@@ -487,8 +524,48 @@ def all_traces_with_counts(data):
 
 
 
-def fitness_token_replay(log, model):
-    traces = all_traces_with_counts(log)
+"""
+Token replay fitness of the log on the model.
+mode='serial' replays the traces one by one on the PetriNet, mode='batch' replays all variants
+together as a marking matrix on the compiled net (see replay.py), mode='trie' replays shared
+prefixes once (see trie_token_replay) and mode='cached' replays through the memoized marking
+automaton of the net (see replaycache.py), all of them give the same fitness.
+With workers > 1 the unique traces are split into shards that are replayed in a process pool.
+completion='shortest' finishes every trace along the cheapest firing sequence to 'end' and counts
+the tokens left in the net as remaining (see completion.py), it is supported by the serial and trie modes.
+"""
+def fitness_token_replay(log, model, mode='serial', workers=None, completion='greedy'):
+    with PROFILER.timer('fitness_token_replay.variants'):
+        traces = all_traces_with_counts(log)
+    
+    if mode not in ('serial', 'batch', 'trie', 'cached'):
+        raise ValueError(f"Unknown replay mode {mode}.")
+    if completion not in ('greedy', 'shortest'):
+        raise ValueError(f"Unknown completion {completion}.")
+    if completion == 'shortest' and mode not in ('serial', 'trie'):
+        raise ValueError(f"Replay mode {mode} only supports the greedy completion.")
+    
+    with PROFILER.timer('fitness_token_replay.replay'):
+        if workers is not None and workers > 1:
+            sums = parallel_replay(traces, model, mode, workers, completion)
+        else:
+            sums = replay_traces(traces, model, mode, completion)
+    
+    return fitness(*sums)
+
+
+"""
+Returns the sums of Ni*Ci, Ni*Pi, Ni*Mi and Ni*Ri over the [activity, ..., count] traces.
+"""
+def replay_traces(traces, model, mode='serial', completion='greedy'):
+    if mode == 'batch':
+        return weighted_sums(batch_token_replay(traces, model))
+    if mode == 'trie':
+        sums, _ = trie_token_replay(traces, model, completion)
+        return sums
+    if mode == 'cached':
+        return model.replay_cache().replay(traces)
+    
     sumNiMi = 0
     sumNiCi = 0
     sumNiRi = 0
@@ -496,7 +573,7 @@ def fitness_token_replay(log, model):
     for trace in traces:
         Ni = trace[-1]
         trace = trace[:-1]
-        (Ci, Pi, Mi, Ri)= fire_transition_in_trace(trace, model)
+        (Ci, Pi, Mi, Ri)= fire_transition_in_trace(trace, model, completion)
         sumNiMi += Ni * Mi
         sumNiCi += Ni * Ci
         sumNiRi += Ni * Ri
@@ -509,29 +586,145 @@ def fitness_token_replay(log, model):
         # For the next trace, reset the model
         model.reset()
 
+    return (sumNiCi, sumNiPi, sumNiMi, sumNiRi)
+
 
-    f = 0.5 * (1 - (sumNiMi / sumNiCi)) + 0.5 * (1 - (sumNiRi / sumNiPi))
-    return f
+# Model, replay mode and completion of a replay worker process, set once by init_replay_worker
+worker_model = None
+worker_mode = None
+worker_completion = None
 
+def init_replay_worker(model, mode, completion='greedy'):
+    global worker_model, worker_mode, worker_completion
+    worker_model = model.compile() if mode == 'batch' else model
+    worker_mode = mode
+    worker_completion = completion
+    if mode != 'batch':
+        worker_model.reset()
 
 
+def replay_shard(traces):
+    return replay_traces(traces, worker_model, worker_mode, worker_completion)
 
-def fire_transition_in_trace(trace, model:PetriNet):
+
+"""
+Replays the traces in a process pool. The model is sent to every worker once through the
+initializer, the tasks only carry the traces of their shard. The per shard sums are integers
+and are added up in shard order, so the result is the same as the serial one for any number of workers.
+"""
+def parallel_replay(traces, model, mode, workers, completion='greedy', shards_per_worker=4):
+    number_of_shards = min(len(traces), workers * shards_per_worker) or 1
+    size = -(-len(traces) // number_of_shards)
+    shards = [traces[i:i + size] for i in range(0, len(traces), size)]
+    
+    sums = [0, 0, 0, 0]
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_replay_worker, initargs=(model, mode, completion)) as executor:
+        for shard_sums in executor.map(replay_shard, shards):
+            for i, value in enumerate(shard_sums):
+                sums[i] += value
+    
+    return tuple(sums)
+
+
+
+
+def fire_transition_in_trace(trace, model:PetriNet, completion='greedy'):
     for transition in trace:
         model.fire_transition(transition, forced=True)
     
-    if model.places['end'] == 0:
-        model.missing += 1
-        while model.places['end'] == 0:
-        # Model is not finished yet
-            model.fire_next_transition()
+    return complete_trace(model, completion)
+
+
+# Forces the model to the end place once the trace is replayed and returns (Ci, Pi, Mi, Ri)
+def complete_trace(model:PetriNet, completion='greedy'):
+    with PROFILER.timer('fitness_token_replay.completion'):
+        if completion == 'shortest':
+            return complete_shortest(model, model.shortest_completion())
+        
+        if model.places['end'] == 0:
+            model.missing += 1
+            while model.places['end'] == 0:
+            # Model is not finished yet
+                model.fire_next_transition()
+        
     
+        model.remove_marking('end')
+        return (model.consumed, model.produced, model.missing, model.missing)
+
 
-    model.remove_marking('end')
-    return (model.consumed, model.produced, model.missing, model.missing)
+"""
+Builds a prefix trie of the [activity, ..., count] traces.
+Every node is a list [children, count] where children maps the next activity to its node
+and count is the number of cases whose trace ends at the node.
+"""
+def build_trace_trie(traces):
+    root = [{}, 0]
+    for trace in traces:
+        node = root
+        for activity in trace[:-1]:
+            if activity not in node[0]:
+                node[0][activity] = [{}, 0]
+            node = node[0][activity]
+        node[1] += trace[-1]
+    return root
 
 
+def save_state(model:PetriNet):
+    return (dict(model.places), model.consumed, model.produced, model.missing)
 
 
+def restore_state(model:PetriNet, state):
+    places, model.consumed, model.produced, model.missing = state
+    model.places.update(places)
 
 
+"""
+Replays the traces on the PetriNet by walking their prefix trie depth first, so a prefix shared
+by several variants is replayed once. The marking and the consumed/produced/missing counters are
+saved where the trie branches (or a trace ends) and restored before the next branch is replayed.
+Returns the sums of Ni*Ci, Ni*Pi, Ni*Mi and Ni*Ri together with the number of events replayed,
+the number of events in the log and their ratio.
+"""
+def trie_token_replay(traces, model:PetriNet, completion='greedy'):
+    trie = build_trace_trie(traces)
+    sums = [0, 0, 0, 0]
+    replayed = 0
+    events_in_log = sum((len(trace) - 1) * trace[-1] for trace in traces)
+    
+    model.reset()
+    stack = [(None, trie, save_state(model))]
+    while stack:
+        activity, node, state = stack.pop()
+        restore_state(model, state)
+        
+        while True:
+            if activity is not None:
+                model.fire_transition(activity, forced=True)
+                replayed += 1
+            
+            children, count = node
+            if count:
+                # A trace ends here, complete a copy of the state and continue from the saved one
+                state = save_state(model)
+                for i, value in enumerate(complete_trace(model, completion)):
+                    sums[i] += count * value
+                restore_state(model, state)
+            
+            # Follow a chain of single children without saving the state
+            if len(children) == 1:
+                activity, node = next(iter(children.items()))
+                continue
+            
+            if children:
+                state = save_state(model)
+                for child_activity, child in children.items():
+                    stack.append((child_activity, child, state))
+            break
+    
+    model.reset()
+    stats = {
+        'events_replayed': replayed,
+        'events_in_log': events_in_log,
+        'ratio': replayed / events_in_log if events_in_log else 0.0,
+    }
+    return tuple(sums), stats
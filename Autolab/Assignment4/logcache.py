@@ -0,0 +1,123 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+from eventlog import EventLog
+
+CACHE_VERSION = 2 # 2: timestamps are normalized to UTC
+CACHE_DIRECTORY = '.xescache'
+MAX_CACHE_BYTES = 1 << 30 # 1 GiB per cache directory
+ARRAYS = ('activity_codes', 'case_offsets', 'timestamps')
+
+
+"""
+Returns the EventLog of an XES file, loading it from the binary cache next to the file when possible.
+load(filename) is only called on a cache miss and must return an EventLog.
+Entries are keyed by the absolute path, size, mtime and a sha256 of the content:
+ - size and mtime unchanged -> the entry is used as is
+ - size or mtime changed    -> the content hash decides, a touched but identical file keeps its entry
+ - content changed          -> the entry is rebuilt
+"""
+def read_cached(filename, load, cache_dir=None, max_bytes=MAX_CACHE_BYTES):
+    path = os.path.abspath(filename)
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(path), CACHE_DIRECTORY)
+
+    entry = os.path.join(cache_dir, hashlib.sha1(path.encode('utf-8')).hexdigest()[:16])
+    stat = os.stat(path)
+    meta = read_meta(entry)
+
+    if meta is not None and meta['path'] == path:
+        if meta['size'] == stat.st_size and meta['mtime_ns'] == stat.st_mtime_ns:
+            return load_entry(entry, meta)
+
+        if meta['size'] == stat.st_size and meta['sha256'] == file_hash(path):
+            meta['mtime_ns'] = stat.st_mtime_ns
+            write_meta(entry, meta)
+            return load_entry(entry, meta)
+
+    log = load(filename)
+    write_entry(entry, log, {
+        'version': CACHE_VERSION,
+        'path': path,
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sha256': file_hash(path),
+    })
+    evict(cache_dir, max_bytes, keep=entry)
+    return log
+
+
+def file_hash(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_meta(entry):
+    try:
+        with open(os.path.join(entry, 'meta.json')) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if meta.get('version') != CACHE_VERSION:
+        return None
+    return meta
+
+
+def write_meta(entry, meta):
+    with open(os.path.join(entry, 'meta.json'), 'w') as f:
+        json.dump(meta, f)
+
+
+# The arrays are memory mapped, so only the pages that are actually scanned are read from disk
+def load_entry(entry, meta):
+    arrays = [np.load(os.path.join(entry, f'{name}.npy'), mmap_mode='r') for name in ARRAYS]
+    # Touch the entry so eviction sees it as recently used
+    os.utime(entry)
+    return EventLog(meta['activities'], *arrays, meta['case_ids'])
+
+
+def write_entry(entry, log, meta):
+    os.makedirs(os.path.dirname(entry), exist_ok=True)
+    meta = dict(meta, activities=log.activities, case_ids=log.case_ids)
+
+    # Write into a temporary directory first so a crash never leaves a half written entry behind
+    temp = tempfile.mkdtemp(dir=os.path.dirname(entry))
+    try:
+        for name in ARRAYS:
+            np.save(os.path.join(temp, f'{name}.npy'), getattr(log, name))
+        write_meta(temp, meta)
+        if os.path.exists(entry):
+            shutil.rmtree(entry)
+        os.replace(temp, entry)
+    except BaseException:
+        shutil.rmtree(temp, ignore_errors=True)
+        raise
+
+
+def entry_size(entry):
+    return sum(os.path.getsize(os.path.join(entry, name)) for name in os.listdir(entry))
+
+
+# Removes the least recently used entries until the cache directory fits in max_bytes
+def evict(cache_dir, max_bytes, keep=None):
+    entries = []
+    for name in os.listdir(cache_dir):
+        entry = os.path.join(cache_dir, name)
+        if os.path.isdir(entry):
+            entries.append((os.path.getmtime(entry), entry, entry_size(entry)))
+
+    total = sum(size for _, _, size in entries)
+    for _, entry, size in sorted(entries):
+        if total <= max_bytes:
+            break
+        if entry == keep:
+            continue
+        shutil.rmtree(entry, ignore_errors=True)
+        total -= size
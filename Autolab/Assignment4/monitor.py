@@ -0,0 +1,130 @@
+import time
+from collections import OrderedDict, deque
+import numpy as np
+from replay import compile_model
+
+
+"""
+Online conformance monitor that replays events against a fixed mined net as they arrive.
+Every open case keeps its marking (packed int32 bytes) and its consumed, produced and missing
+counters; each (case_id, activity) event is fired with the forced semantics of
+PetriNet.fire_transition and the running counts of the case are emitted.
+Cases are evicted when they were idle for idle_timeout seconds or, least recently used first,
+when more than max_cases are open, so memory stays bounded.
+Activities the net does not know are counted in 'unknown' and leave the marking unchanged.
+"""
+class ConformanceMonitor():
+    def __init__(self, model, max_cases=1000000, idle_timeout=None, latency_window=10000):
+        self.net = compile_model(model)
+        self.pre = self.net.pre.T.astype(np.int32) # transition -> input arcs
+        self.effect = self.net.effect.T.astype(np.int32)
+        self.pre_count = self.pre.sum(axis=1).tolist()
+        self.post_count = self.net.post.sum(axis=0).tolist()
+        self.initial_marking = self.net.initial_marking.astype(np.int32).tobytes()
+        self.initial_produced = int(self.net.initial_marking.sum())
+
+        self.max_cases = max_cases
+        self.idle_timeout = idle_timeout
+        # case_id -> [marking, consumed, produced, missing, unknown, last seen], least recently used first
+        self.cases = OrderedDict()
+        self.evicted = 0
+        self.events = 0
+        self.latencies = deque(maxlen=latency_window)
+        self.max_latency = 0.0
+
+    def new_case(self, now):
+        return [self.initial_marking, 0, self.initial_produced, 0, 0, now]
+
+    """
+    Processes one event and returns the running counts of its case.
+    now is the time of the event used for the idle timeout, the monotonic clock by default.
+    """
+    def feed(self, case_id, activity, now=None):
+        started = time.perf_counter()
+        now = time.monotonic() if now is None else now
+
+        state = self.cases.get(case_id)
+        if state is None:
+            state = self.cases[case_id] = self.new_case(now)
+        else:
+            self.cases.move_to_end(case_id)
+
+        t = self.net.transition_index.get(activity)
+        if t is None:
+            state[4] += 1
+        else:
+            marking = np.frombuffer(state[0], dtype=np.int32)
+            lacking = np.maximum(self.pre[t] - marking, 0)
+            state[0] = (marking + lacking + self.effect[t]).tobytes()
+            state[1] += self.pre_count[t]
+            state[2] += self.post_count[t]
+            state[3] += int(lacking.sum())
+        state[5] = now
+
+        self.evict(now)
+        self.events += 1
+
+        latency = time.perf_counter() - started
+        self.latencies.append(latency)
+        self.max_latency = max(self.max_latency, latency)
+        return {
+            'case_id': case_id,
+            'activity': activity,
+            'consumed': state[1],
+            'produced': state[2],
+            'missing': state[3],
+            'unknown': state[4],
+            'latency': latency,
+        }
+
+    def evict(self, now):
+        while len(self.cases) > self.max_cases:
+            self.cases.popitem(last=False)
+            self.evicted += 1
+
+        if self.idle_timeout is None:
+            return
+        # The least recently used case is the one that has been idle the longest
+        while self.cases:
+            case_id, state = next(iter(self.cases.items()))
+            if now - state[5] <= self.idle_timeout:
+                break
+            del self.cases[case_id]
+            self.evicted += 1
+
+    # Removes a finished case and returns its final counts, or None if it is not open
+    def close_case(self, case_id):
+        state = self.cases.pop(case_id, None)
+        if state is None:
+            return None
+        return {'consumed': state[1], 'produced': state[2], 'missing': state[3], 'unknown': state[4]}
+
+    def marking(self, case_id):
+        tokens = np.frombuffer(self.cases[case_id][0], dtype=np.int32)
+        return {place: int(value) for place, value in zip(self.net.places, tokens) if value}
+
+    """
+    asyncio ingestion: consumes (case_id, activity) pairs from an async iterable or an asyncio.Queue
+    (until it yields None) and yields the result of every event.
+    """
+    async def stream(self, source):
+        if hasattr(source, 'get'):
+            while True:
+                item = await source.get()
+                if item is None:
+                    return
+                yield self.feed(*item)
+        else:
+            async for case_id, activity in source:
+                yield self.feed(case_id, activity)
+
+    def stats(self):
+        latencies = sorted(self.latencies)
+        return {
+            'events': self.events,
+            'open_cases': len(self.cases),
+            'evicted_cases': self.evicted,
+            'mean_latency': sum(latencies) / len(latencies) if latencies else 0.0,
+            'p99_latency': latencies[int(0.99 * (len(latencies) - 1))] if latencies else 0.0,
+            'max_latency': self.max_latency,
+        }
@@ -0,0 +1,151 @@
+import heapq
+from collections import OrderedDict, deque
+from datetime import datetime
+from index import build_petri_net, get_casual_pairs, relation_matrix
+
+EPOCH = datetime(1970, 1, 1)
+
+
+"""
+Space-saving summary of the directly-follows counts with at most capacity counters.
+When a new pair arrives and all counters are taken, the pair with the smallest count is replaced
+and the new pair inherits that count as its error, so count - error never overestimates.
+The smallest counter is found with a min-heap of (count, sequence, pair) entries that is updated
+lazily: every change pushes a new entry and entries whose count is no longer the count of their
+pair are skipped when they reach the top, so an update costs O(log capacity) instead of a scan.
+"""
+class SpaceSaving():
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.counters = {} # pair -> [count, error]
+        self.heap = [] # (count, sequence, pair), possibly outdated
+        self.sequence = 0
+
+    def push(self, pair, count):
+        self.sequence += 1
+        heapq.heappush(self.heap, (count, self.sequence, pair))
+        # Rebuild once the outdated entries outnumber the counters, amortized O(1) per update
+        if len(self.heap) > 2 * len(self.counters) + 64:
+            self.heap = [(count, i, pair) for i, (pair, (count, _)) in enumerate(self.counters.items())]
+            heapq.heapify(self.heap)
+
+    def pop_smallest(self):
+        while True:
+            count, _, pair = heapq.heappop(self.heap)
+            counter = self.counters.get(pair)
+            if counter is not None and counter[0] == count:
+                del self.counters[pair]
+                return count
+
+    def add(self, pair, count=1):
+        counter = self.counters.get(pair)
+        if counter is not None:
+            counter[0] += count
+            self.push(pair, counter[0])
+            return
+
+        if len(self.counters) < self.capacity:
+            self.counters[pair] = [count, 0]
+            self.push(pair, count)
+            return
+
+        minimum = self.pop_smallest()
+        self.counters[pair] = [minimum + count, minimum]
+        self.push(pair, minimum + count)
+
+    # Pairs whose guaranteed count (count - error) is at least min_count
+    def frequent(self, min_count=1):
+        return {pair: count - error for pair, (count, error) in self.counters.items() if count - error >= min_count}
+
+
+"""
+Online alpha discovery over an event stream ordered by time.
+Only the last activity of every open case is kept (at most max_open_cases, least recently used
+are dropped), and the directly-follows counts are kept per time bucket of slide seconds in a
+space-saving summary of capacity counters. The current window is made of the buckets of the
+last window seconds, so window == slide gives tumbling windows and slide < window sliding ones.
+A case starts with the first event seen for it and its end activity is its latest event in the window.
+close_case forgets a finished case, so a later event with the same id starts a new case.
+"""
+class OnlineDiscovery():
+    def __init__(self, window, slide=None, capacity=10000, max_open_cases=100000, min_count=1):
+        self.window = window
+        self.slide = slide or window
+        self.capacity = capacity
+        self.max_open_cases = max_open_cases
+        self.min_count = min_count
+        self.last_activity = OrderedDict() # case_id -> last activity, least recently used first
+        self.buckets = deque() # (bucket id, summary, start activities, case_id -> latest activity)
+        self.events = 0
+
+    def to_seconds(self, timestamp):
+        if isinstance(timestamp, datetime):
+            return (timestamp.replace(tzinfo=None) - EPOCH).total_seconds()
+        return timestamp
+
+    def bucket(self, seconds):
+        bucket_id = int(seconds // self.slide)
+        if not self.buckets or self.buckets[-1][0] < bucket_id:
+            self.buckets.append((bucket_id, SpaceSaving(self.capacity), set(), OrderedDict()))
+
+        # Drop the buckets that left the window
+        first = bucket_id - int(-(-self.window // self.slide)) + 1
+        while self.buckets[0][0] < first:
+            self.buckets.popleft()
+        return self.buckets[-1]
+
+    def add_event(self, case_id, activity, timestamp):
+        _, summary, start, latest = self.bucket(self.to_seconds(timestamp))
+        self.events += 1
+
+        previous = self.last_activity.pop(case_id, None)
+        if previous is None:
+            start.add(activity)
+        else:
+            summary.add((previous, activity))
+
+        self.last_activity[case_id] = activity
+        latest.pop(case_id, None)
+        latest[case_id] = activity
+        if len(self.last_activity) > self.max_open_cases:
+            self.last_activity.popitem(last=False)
+        if len(latest) > self.max_open_cases:
+            latest.popitem(last=False)
+
+    def close_case(self, case_id):
+        self.last_activity.pop(case_id, None)
+
+    # Dependency graph of the current window, in the shape returned by dependency_graph
+    def dependency_graph(self):
+        counts = {}
+        for _, summary, _, _ in self.buckets:
+            for pair, count in summary.frequent(self.min_count).items():
+                counts[pair] = counts.get(pair, 0) + count
+
+        df = {}
+        for (task, next_task), count in counts.items():
+            df.setdefault(task, {})[next_task] = count
+        return df
+
+    def start_activities(self):
+        return set().union(*(start for _, _, start, _ in self.buckets))
+
+    def end_activities(self):
+        latest = {}
+        for _, _, _, bucket_latest in self.buckets:
+            latest.update(bucket_latest)
+        return set(latest.values())
+
+    def footprint(self):
+        return relation_matrix(self.dependency_graph())
+
+    def model(self, compiled=False):
+        return build_petri_net(self.start_activities(), self.end_activities(), get_casual_pairs(self.footprint()), compiled)
+
+    def stats(self):
+        return {
+            'events': self.events,
+            'open_cases': len(self.last_activity),
+            'buckets': len(self.buckets),
+            'counters': sum(len(summary.counters) for _, summary, _, _ in self.buckets),
+        }
@@ -0,0 +1,161 @@
+import io
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from eventlog import EventLog
+from index import CACHED_ATTRIBUTES, RAW_DATES, iter_traces, parse_raw_timestamps
+
+TRACE_START = b'<trace'
+TRACE_END = b'</trace>'
+
+
+"""
+Scans the raw bytes of an XES file for its <trace> elements without parsing the XML and returns
+(header_end, ranges) where header_end is the offset of the first trace (everything before it is
+the <log> header) and ranges are the (start, end) byte offsets of every trace in file order.
+With use_mmap=True the file is searched through a read only memory map instead of being read.
+"""
+def trace_ranges(filename, use_mmap=True):
+    with open(filename, 'rb') as f:
+        if use_mmap and os.fstat(f.fileno()).st_size > 0:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return find_traces(data)
+        return find_traces(f.read())
+
+
+def find_traces(data):
+    ranges = []
+    position = data.find(TRACE_START)
+    header_end = position if position >= 0 else len(data)
+
+    # A comment or CDATA section in the body may hide or fake trace tags, the body is then a single chunk
+    if position >= 0 and (data.find(b'<!--', header_end) >= 0 or data.find(b'<![CDATA[', header_end) >= 0):
+        return header_end, [(header_end, data.rfind(b'</log>'))]
+
+    while position >= 0:
+        # Skip other tags that start with <trace
+        if data[position + len(TRACE_START):position + len(TRACE_START) + 1] not in (b'>', b' ', b'\t', b'\r', b'\n', b'/'):
+            position = data.find(TRACE_START, position + 1)
+            continue
+
+        end = data.find(TRACE_END, position)
+        if end < 0:
+            raise ValueError(f"Unterminated <trace> at byte {position}.")
+        end += len(TRACE_END)
+        ranges.append((position, end))
+        position = data.find(TRACE_START, end)
+
+    return header_end, ranges
+
+
+# Groups the trace ranges into at most number_of_chunks contiguous byte ranges of similar size
+def split_ranges(ranges, number_of_chunks):
+    if not ranges:
+        return []
+    total = ranges[-1][1] - ranges[0][0]
+    size = max(total // max(number_of_chunks, 1), 1)
+
+    chunks = []
+    start = ranges[0][0]
+    for _, end in ranges:
+        if end - start >= size:
+            chunks.append((start, end))
+            start = end
+    if start < ranges[-1][1]:
+        chunks.append((start, ranges[-1][1]))
+    return chunks
+
+
+"""
+Parses the traces between the byte offsets start and end of the file. The chunk is wrapped in the
+<log> header of the file, so namespaces and the encoding are the same as for the whole document.
+With compact=True the chunk is returned as the arrays of its EventLog, whose timestamps are parsed
+in bulk like in read_event_log, otherwise (or when the events do not fit in an EventLog, e.g. a
+time:timestamp that is not a date) as the list of (case_id, events) pairs.
+"""
+def parse_chunk(filename, header_end, start, end, attributes=None, compact=False):
+    with open(filename, 'rb') as f:
+        header = f.read(header_end)
+        f.seek(start)
+        body = f.read(end - start)
+
+    document = header + body + b'</log>'
+    if not compact:
+        return list(iter_traces(io.BytesIO(document), attributes))
+
+    try:
+        log = EventLog.from_cases(iter_traces(io.BytesIO(document), attributes, RAW_DATES), parse_timestamps=parse_raw_timestamps)
+    except (KeyError, TypeError):
+        # Parsed again with the dates decoded, for the dictionary or the error of the serial reader
+        return list(iter_traces(io.BytesIO(document), attributes))
+    return log_arrays(log)
+
+
+def log_arrays(log):
+    return log.activities, log.activity_codes, log.case_offsets, log.timestamps, log.case_ids
+
+
+# Concatenates the EventLog arrays of the chunks in file order into a single EventLog
+def merge_chunks(chunks):
+    activity_index = {}
+    codes, offsets, timestamps, case_ids = [], [np.zeros(1, dtype=np.int64)], [], []
+    events = 0
+
+    for chunk in chunks:
+        if isinstance(chunk, list):
+            # Raises the error the serial EventLog.from_cases raises for the chunk
+            chunk = log_arrays(EventLog.from_cases(chunk))
+        activities, chunk_codes, chunk_offsets, chunk_timestamps, chunk_case_ids = chunk
+        # Chunk code -> code in the merged vocabulary, first seen first as in EventLog.from_cases
+        recode = np.array([activity_index.setdefault(name, len(activity_index)) for name in activities], dtype=np.int32)
+        codes.append(recode[chunk_codes] if len(recode) else chunk_codes)
+        offsets.append(chunk_offsets[1:] + events)
+        timestamps.append(chunk_timestamps)
+        case_ids.extend(chunk_case_ids)
+        events += len(chunk_codes)
+
+    return EventLog(
+        activity_index,
+        np.concatenate(codes) if codes else np.zeros(0, dtype=np.int32),
+        np.concatenate(offsets),
+        np.concatenate(timestamps) if timestamps else np.zeros(0, dtype=np.int64),
+        case_ids,
+    )
+
+
+def parse_chunks(filename, workers=None, chunks_per_worker=4, use_mmap=True, attributes=None, compact=False):
+    workers = workers or os.cpu_count() or 1
+    header_end, ranges = trace_ranges(filename, use_mmap)
+    chunks = split_ranges(ranges, workers * chunks_per_worker)
+    if workers == 1 or len(chunks) <= 1:
+        return [parse_chunk(filename, header_end, start, end, attributes, compact) for start, end in chunks]
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as executor:
+        futures = [executor.submit(parse_chunk, filename, header_end, start, end, attributes, compact) for start, end in chunks]
+        # Collected in submission order, i.e. in file order
+        return [future.result() for future in futures]
+
+
+"""
+Parallel read_from_file: the file is split at <trace> boundaries into chunks that are parsed in a
+process pool and merged in file order, so the result is the same dictionary (including the dropped
+traces without a concept:name and the later case winning for a repeated case id).
+When attributes is a projection on CACHED_ATTRIBUTES the workers send back compact EventLog arrays
+instead of pickled event dictionaries.
+"""
+def read_parallel(filename, attributes=None, workers=None, chunks_per_worker=4, use_mmap=True):
+    compact = attributes is not None and 'concept:name' in attributes and set(attributes) <= CACHED_ATTRIBUTES
+
+    log_data = {}
+    for chunk in parse_chunks(filename, workers, chunks_per_worker, use_mmap, attributes, compact):
+        if not isinstance(chunk, list):
+            chunk = EventLog(*chunk).to_dict().items()
+        for case_id, events in chunk:
+            log_data[case_id] = events
+    return log_data
+
+
+# Parallel version of read_event_log (without the binary cache)
+def read_event_log_parallel(filename, workers=None, chunks_per_worker=4, use_mmap=True, attributes=CACHED_ATTRIBUTES):
+    return merge_chunks(parse_chunks(filename, workers, chunks_per_worker, use_mmap, attributes, compact=True))
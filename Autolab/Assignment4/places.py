@@ -0,0 +1,93 @@
+from footprint import CHOICE, DIRECT, Footprint
+
+
+"""
+Alpha step 4 and 5: finds every maximal pair (A, B) such that
+ - every a in A is in direct relation with every b in B
+ - the activities inside A, and inside B, are pairwise in choice relation (including with themselves)
+Sets are encoded as integer bitsets over the activity codes of the footprint.
+The pairs are the maximal cliques of one graph with a left copy (bit a) and a right copy (bit n + b)
+of every activity: two left or two right copies are adjacent when they are in choice relation and
+a left a is adjacent to a right b when a -> b. A maximal clique with both sides non empty is a
+maximal pair and the other way around, so Bron-Kerbosch with pivoting only ever completes maximal
+pairs, instead of growing every subset of A and rejecting the non maximal ones afterwards.
+Every clique is started from its lowest right activity, so each pair is found once.
+
+Returns the pairs in the format of get_casual_pairs (a plain name for a single activity, a tuple
+for more) together with the number of search nodes explored and of branches pruned.
+"""
+def maximal_pairs(relation_matrix):
+    footprint = relation_matrix if isinstance(relation_matrix, Footprint) else Footprint.from_relation_matrix(relation_matrix)
+    relations = footprint.relations.tolist()
+    n = len(footprint.activities)
+    stats = {'explored': 0, 'pruned': 0}
+
+    # Activities in a loop of length one can never be part of a place
+    usable = [footprint.present[a] and relations[a][a] == CHOICE for a in range(n)]
+    choice = [0] * n # choice[a] -> bitset of the other usable activities in choice relation with a
+    successors = [0] * n # successors[a] -> bitset of usable b with a -> b
+    predecessors = [0] * n # predecessors[b] -> bitset of usable a with a -> b
+    for a in range(n):
+        if not usable[a]:
+            continue
+        for b in range(n):
+            if not usable[b]:
+                continue
+            if relations[a][b] == CHOICE and a != b:
+                choice[a] |= 1 << b
+            elif relations[a][b] == DIRECT:
+                successors[a] |= 1 << b
+                predecessors[b] |= 1 << a
+
+    left = (1 << n) - 1
+    neighbours = [choice[a] | successors[a] << n for a in range(n)] + [choice[b] << n | predecessors[b] for b in range(n)]
+
+    pairs = set()
+    for b in range(n):
+        if not usable[b] or not predecessors[b]:
+            continue
+        # Right activities below b belong to the cliques started from them
+        lower = ((1 << b) - 1) << n
+        candidates = neighbours[n + b] & ~lower
+        excluded = neighbours[n + b] & lower
+        for clique in maximal_cliques(1 << (n + b), candidates, excluded, neighbours, left, stats):
+            pairs.add((footprint_set(footprint, clique & left), footprint_set(footprint, clique >> n)))
+
+    return pairs, stats
+
+
+"""
+Bron-Kerbosch with pivoting: yields every maximal clique that extends R with vertices of P and
+none of X, where neighbours[v] is the bitset of the vertices adjacent to v.
+Branches that can no longer get a vertex of required are pruned.
+"""
+def maximal_cliques(R, P, X, neighbours, required, stats):
+    stack = [(R, P, X)]
+    while stack:
+        R, P, X = stack.pop()
+        if not (R | P) & required:
+            stats['pruned'] += 1
+            continue
+        if not P and not X:
+            yield R
+            continue
+        stats['explored'] += 1
+
+        pivot = max(bits(P | X), key=lambda u: (P & neighbours[u]).bit_count())
+        for v in bits(P & ~neighbours[pivot]):
+            stack.append((R | 1 << v, P & neighbours[v], X & neighbours[v]))
+            P &= ~(1 << v)
+            X |= 1 << v
+
+
+def bits(bitset):
+    while bitset:
+        low = bitset & -bitset
+        yield low.bit_length() - 1
+        bitset ^= low
+
+
+# A single activity is returned as its name, more activities as a tuple of names
+def footprint_set(footprint, bitset):
+    names = tuple(sorted(footprint.activities[a] for a in bits(bitset)))
+    return names[0] if len(names) == 1 else names
@@ -0,0 +1,76 @@
+import time
+from contextlib import contextmanager, nullcontext
+from json import dumps
+
+# Shared no-op context manager handed out by a disabled profiler
+DISABLED = nullcontext()
+
+
+"""
+Opt-in profiler of the mining pipeline.
+timer(name) is a context manager that adds the wall clock time of its block to the named timer
+and count(name, n) increments a named counter. While the profiler is disabled timer returns a
+shared no-op context manager and the hot loops only test the enabled flag, so the disabled path
+costs an attribute lookup. report() returns the structured {'timers', 'counters'} dictionary.
+Work done in the process pool of parallel_replay is not seen by the profiler of the parent.
+"""
+class Profiler():
+    def __init__(self):
+        self.enabled = False
+        self.timers = {} # name -> [seconds, calls]
+        self.counters = {} # name -> count
+
+    def timer(self, name):
+        if not self.enabled:
+            return DISABLED
+        return self.timed(name)
+
+    @contextmanager
+    def timed(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            timer = self.timers.setdefault(name, [0.0, 0])
+            timer[0] += time.perf_counter() - started
+            timer[1] += 1
+
+    def count(self, name, n=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def reset(self):
+        self.timers = {}
+        self.counters = {}
+
+    def report(self):
+        return {
+            'timers': {name: {'seconds': seconds, 'calls': calls} for name, (seconds, calls) in self.timers.items()},
+            'counters': dict(self.counters),
+        }
+
+    def to_json(self, indent=4):
+        return dumps(self.report(), indent=indent)
+
+
+# The profiler the pipeline in index.py reports to
+PROFILER = Profiler()
+
+
+"""
+Enables the profiler for the duration of the block and yields it, e.g.
+    with profile() as profiler:
+        fitness_token_replay(log, alpha(log))
+    print(profiler.to_json())
+The counts of an earlier profile() block are cleared unless reset=False.
+"""
+@contextmanager
+def profile(reset=True):
+    if reset:
+        PROFILER.reset()
+    enabled = PROFILER.enabled
+    PROFILER.enabled = True
+    try:
+        yield PROFILER
+    finally:
+        PROFILER.enabled = enabled
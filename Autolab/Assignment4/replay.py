@@ -0,0 +1,115 @@
+import numpy as np
+from compiled import CompiledPetriNet
+
+
+def compile_model(model):
+    return model if isinstance(model, CompiledPetriNet) else model.compile()
+
+
+# Converts the [activity, ..., count] lists of all_traces_with_counts into transition indexes and counts
+def encode_traces(traces, net):
+    sequences = []
+    counts = []
+    for trace in traces:
+        sequence = []
+        for activity in trace[:-1]:
+            if activity not in net.transition_index:
+                raise ValueError(f"Transition {activity} does not exist.")
+            sequence.append(net.transition_index[activity])
+        sequences.append(sequence)
+        counts.append(trace[-1])
+    return sequences, np.array(counts, dtype=np.int64)
+
+
+# First transition (in the order the transitions were added) consuming from every place, -1 if there is none
+def first_consumers(net):
+    consumers = np.full(net.number_of_places(), -1, dtype=np.int64)
+    for p in range(net.number_of_places()):
+        transitions = np.flatnonzero(net.pre[p])
+        if len(transitions):
+            consumers[p] = transitions[0]
+    return consumers
+
+
+"""
+Replays every variant at once on the compiled net, with one marking row per variant.
+At every step all variants that still have events fire their next transition together, missing
+input tokens are created by clipping the marking at the input arcs (the forced firing of PetriNet).
+Variants that do not reach 'end' are completed the same way fire_transition_in_trace does it, so
+the counts (and therefore the fitness) are exactly the ones of the serial replay:
+ - one missing token is counted for the unfinished trace
+ - the first place holding exactly one token fires its first consumer, only forced firings are counted
+Returns per variant arrays of consumed, produced, missing and remaining tokens together with the
+variant counts; remaining mirrors fire_transition_in_trace, which reports the missing tokens there.
+"""
+def batch_token_replay(traces, model):
+    net = compile_model(model)
+    sequences, counts = encode_traces(traces, net)
+    number_of_variants = len(sequences)
+    end = net.place_index['end']
+
+    pre = net.pre.T.astype(np.int64) # transition -> input arcs
+    effect = net.effect.T.astype(np.int64) # transition -> marking change
+    pre_count = pre.sum(axis=1)
+    post_count = net.post.sum(axis=0).astype(np.int64)
+
+    # steps[v][k] -> k-th transition of variant v, -1 once the variant has no events left
+    length = max((len(sequence) for sequence in sequences), default=0)
+    steps = np.full((number_of_variants, length), -1, dtype=np.int64)
+    for v, sequence in enumerate(sequences):
+        steps[v, :len(sequence)] = sequence
+
+    marking = np.tile(net.initial_marking.astype(np.int64), (number_of_variants, 1))
+    consumed = np.zeros(number_of_variants, dtype=np.int64)
+    produced = np.full(number_of_variants, int(net.initial_marking.sum()), dtype=np.int64)
+    missing = np.zeros(number_of_variants, dtype=np.int64)
+
+    for k in range(length):
+        rows = np.flatnonzero(steps[:, k] >= 0)
+        transitions = steps[rows, k]
+        lacking = np.maximum(pre[transitions] - marking[rows], 0)
+        marking[rows] += lacking + effect[transitions]
+        missing[rows] += lacking.sum(axis=1)
+        consumed[rows] += pre_count[transitions]
+        produced[rows] += post_count[transitions]
+
+    # Force the unfinished variants to the end place
+    unfinished = marking[:, end] == 0
+    missing[unfinished] += 1
+    consumers = first_consumers(net)
+    while unfinished.any():
+        rows = np.flatnonzero(unfinished)
+        candidates = (marking[rows] == 1) & (consumers >= 0)
+        if not candidates.any(axis=1).all():
+            raise ValueError("Transition None does not exist.")
+
+        transitions = consumers[candidates.argmax(axis=1)]
+        lacking = np.maximum(pre[transitions] - marking[rows], 0)
+        marking[rows] += lacking + effect[transitions]
+
+        forced = lacking.any(axis=1)
+        consumed[rows[forced]] += pre_count[transitions[forced]]
+        produced[rows[forced]] += post_count[transitions[forced]]
+        unfinished = marking[:, end] == 0
+
+    # Consume the token in the end place
+    marking[:, end] -= 1
+    consumed += 1
+
+    return {
+        'counts': counts,
+        'consumed': consumed,
+        'produced': produced,
+        'missing': missing,
+        'remaining': missing.copy(),
+    }
+
+
+# Sums of Ni*Ci, Ni*Pi, Ni*Mi and Ni*Ri over all variants of a replay result
+def weighted_sums(result):
+    counts = result['counts']
+    return tuple(int((counts * result[key]).sum()) for key in ('consumed', 'produced', 'missing', 'remaining'))
+
+
+def fitness(sumNiCi, sumNiPi, sumNiMi, sumNiRi):
+    return 0.5 * (1 - (sumNiMi / sumNiCi)) + 0.5 * (1 - (sumNiRi / sumNiPi))
@@ -0,0 +1,100 @@
+from collections import OrderedDict
+
+# Activity used as key for the completion to the end place after the last event of a trace
+COMPLETE = None
+
+
+"""
+Memoizing token replay for a fixed PetriNet.
+Every forced firing is stored as (marking, activity) -> (next marking, consumed, produced, missing),
+so the cache grows into a deterministic automaton over the reachable markings while traces are
+replayed. The completion to the end place is stored the same way under the activity COMPLETE.
+Markings are packed into bytes (or a tuple when a place holds more than 255 tokens) and the
+table is bounded by max_entries, the least recently used entries are evicted first.
+
+complete is the function that forces the model to the end place (complete_trace in index.py),
+it is passed in so the cache replays with exactly the semantics of fire_transition_in_trace.
+"""
+class ReplayCache():
+    def __init__(self, model, complete, max_entries=100000):
+        self.model = model
+        self.complete = complete
+        self.max_entries = max_entries
+        self.places = list(model.places)
+        self.table = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        model.reset()
+        self.initial_marking = self.pack(model.places[place] for place in self.places)
+        self.initial_produced = model.produced
+
+    def pack(self, tokens):
+        tokens = tuple(tokens)
+        if all(0 <= value < 256 for value in tokens):
+            return bytes(tokens)
+        return tokens
+
+    def load(self, marking):
+        for place, tokens in zip(self.places, marking):
+            self.model.places[place] = tokens
+        self.model.consumed = 0
+        self.model.produced = 0
+        self.model.missing = 0
+
+    def lookup(self, marking, activity):
+        key = (marking, activity)
+        entry = self.table.get(key)
+        if entry is not None:
+            self.hits += 1
+            self.table.move_to_end(key)
+            return entry
+
+        self.misses += 1
+        self.load(marking)
+        if activity is COMPLETE:
+            consumed, produced, missing, _ = self.complete(self.model)
+        else:
+            self.model.fire_transition(activity, forced=True)
+            consumed, produced, missing = self.model.consumed, self.model.produced, self.model.missing
+        entry = (self.pack(self.model.places[place] for place in self.places), consumed, produced, missing)
+
+        self.table[key] = entry
+        if len(self.table) > self.max_entries:
+            self.table.popitem(last=False)
+            self.evictions += 1
+        return entry
+
+    # Same (Ci, Pi, Mi, Ri) as fire_transition_in_trace on a reset model
+    def replay_trace(self, trace):
+        marking = self.initial_marking
+        consumed, produced, missing = 0, self.initial_produced, 0
+        for activity in list(trace) + [COMPLETE]:
+            marking, c, p, m = self.lookup(marking, activity)
+            consumed += c
+            produced += p
+            missing += m
+        return (consumed, produced, missing, missing)
+
+    # Returns the sums of Ni*Ci, Ni*Pi, Ni*Mi and Ni*Ri over the [activity, ..., count] traces
+    def replay(self, traces):
+        sums = [0, 0, 0, 0]
+        for trace in traces:
+            for i, value in enumerate(self.replay_trace(trace[:-1])):
+                sums[i] += trace[-1] * value
+        self.model.reset()
+        return tuple(sums)
+
+    def clear(self):
+        self.table.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': len(self.table),
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
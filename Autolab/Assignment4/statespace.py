@@ -0,0 +1,134 @@
+import time
+from collections import deque
+import numpy as np
+
+# Token count standing for the Karp-Miller omega (unbounded number of tokens) in a marking
+OMEGA = np.iinfo(np.int32).max
+
+
+"""
+Reachability (or coverability) graph of a CompiledPetriNet.
+Markings are int32 vectors stored packed as bytes; state s has its outgoing edges at
+targets[offsets[s]:offsets[s + 1]], labelled with the transition indexes in labels.
+"""
+class StateSpace():
+    def __init__(self, net, markings, offsets, targets, labels, complete, elapsed):
+        self.net = net
+        self.markings = markings # state -> packed marking
+        self.offsets = offsets
+        self.targets = targets
+        self.labels = labels
+        self.complete = complete # False when the state or time limit stopped the exploration
+        self.elapsed = elapsed
+        self.state_index = {marking: s for s, marking in enumerate(markings)}
+
+    def __len__(self):
+        return len(self.markings)
+
+    def number_of_edges(self):
+        return len(self.targets)
+
+    def marking(self, state):
+        return np.frombuffer(self.markings[state], dtype=np.int32)
+
+    def find(self, marking):
+        return self.state_index.get(np.asarray(marking, dtype=np.int32).tobytes())
+
+    # Returns the (target states, transition indexes) of the edges leaving state
+    def successors(self, state):
+        start, end = self.offsets[state], self.offsets[state + 1]
+        return self.targets[start:end], self.labels[start:end]
+
+    def is_bounded(self):
+        return self.complete and not any((self.marking(s) == OMEGA).any() for s in range(len(self)))
+
+    def is_reachable(self, place):
+        p = self.net.place_index[place]
+        return any(self.marking(s)[p] > 0 for s in range(len(self)))
+
+    # Transitions that label no edge, only conclusive when the exploration is complete
+    def dead_transitions(self):
+        fired = np.zeros(self.net.number_of_transitions(), dtype=bool)
+        fired[self.labels] = True
+        return [self.net.transitions[t] for t in np.flatnonzero(~fired)]
+
+    def report(self):
+        return {
+            'states': len(self),
+            'edges': self.number_of_edges(),
+            'complete': self.complete,
+            'bounded': self.is_bounded(),
+            'end_reachable': self.is_reachable('end'),
+            'dead_transitions': self.dead_transitions(),
+            'elapsed': self.elapsed,
+        }
+
+
+"""
+Explores the state space of the net breadth first from its initial marking.
+A new marking that strictly covers one of its ancestors gets OMEGA in the places that grew
+(Karp-Miller), so the exploration also ends on unbounded nets. Stops after max_states states or
+max_seconds seconds, the returned StateSpace is then marked as incomplete.
+"""
+def explore(net, max_states=100000, max_seconds=None):
+    started = time.perf_counter()
+    pre = net.pre.T.astype(np.int64)
+    effect = net.effect.T.astype(np.int64)
+
+    initial = net.initial_marking.astype(np.int32)
+    markings = [initial.tobytes()]
+    state_index = {markings[0]: 0}
+    parents = [-1]
+    edges = [] # (source, target, transition)
+
+    queue = deque([0])
+    complete = True
+    while queue:
+        if max_seconds is not None and time.perf_counter() - started > max_seconds:
+            complete = False
+            break
+
+        state = queue.popleft()
+        marking = np.frombuffer(markings[state], dtype=np.int32).astype(np.int64)
+        omega = marking == OMEGA
+        enabled = np.flatnonzero((marking[None, :] >= pre).all(axis=1))
+
+        for t in enabled:
+            following = marking + effect[t]
+            following[omega] = OMEGA
+            following = accelerate(following, state, markings, parents)
+            key = following.astype(np.int32).tobytes()
+
+            target = state_index.get(key)
+            if target is None:
+                if len(markings) >= max_states:
+                    complete = False
+                    continue
+                target = len(markings)
+                state_index[key] = target
+                markings.append(key)
+                parents.append(state)
+                queue.append(target)
+            edges.append((state, target, t))
+
+    offsets, targets, labels = adjacency(len(markings), edges)
+    return StateSpace(net, markings, offsets, targets, labels, complete, time.perf_counter() - started)
+
+
+# Sets OMEGA in the places where marking strictly covers one of the ancestors of state
+def accelerate(marking, state, markings, parents):
+    while state >= 0:
+        ancestor = np.frombuffer(markings[state], dtype=np.int32).astype(np.int64)
+        if (marking >= ancestor).all() and (marking > ancestor).any():
+            marking[marking > ancestor] = OMEGA
+        state = parents[state]
+    return marking
+
+
+# Converts the edge list into compressed sparse row arrays sorted by source state
+def adjacency(number_of_states, edges):
+    edges = np.array(edges, dtype=np.int64).reshape(-1, 3)
+    edges = edges[np.argsort(edges[:, 0], kind='stable')]
+    offsets = np.zeros(number_of_states + 1, dtype=np.int64)
+    np.add.at(offsets, edges[:, 0] + 1, 1)
+    return np.cumsum(offsets), edges[:, 1].copy(), edges[:, 2].copy()
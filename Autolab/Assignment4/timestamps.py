@@ -0,0 +1,67 @@
+import re
+import numpy as np
+from eventlog import NO_TIMESTAMP, to_microseconds
+
+MICROSECONDS_PER_MINUTE = 60 * 1000000
+
+# ISO 8601 date-time split into the local time, its fraction and the UTC offset
+ISO_TIMESTAMP = re.compile(r'(\d{4}-\d\d-\d\d[T ]\d\d:\d\d(?::\d\d)?)(?:\.(\d+))?(Z|[+-]\d\d:?\d\d)?')
+
+
+# Offset in microseconds of 'Z', '+HH:MM', '-HHMM', ... (None is UTC)
+def offset_microseconds(offset):
+    if not offset or offset == 'Z':
+        return 0
+    sign = -1 if offset[0] == '-' else 1
+    digits = offset[1:].replace(':', '')
+    return sign * (int(digits[:2]) * 60 + int(digits[2:])) * MICROSECONDS_PER_MINUTE
+
+
+"""
+Parses the distinct timestamp strings in bulk into microseconds since the epoch (UTC).
+The local times go through one NumPy datetime64 conversion and their UTC offsets are subtracted
+afterwards, so '2020-01-01T01:00:00+01:00' and '2020-01-01T00:00:00Z' give the same value.
+Strings NumPy can not read are parsed one by one with parse_timestamp.
+"""
+def parse_unique(values):
+    local, offsets, fallback = [], [], []
+    for i, value in enumerate(values):
+        match = ISO_TIMESTAMP.fullmatch(value)
+        if match is None:
+            local.append('NaT')
+            offsets.append(0)
+            fallback.append(i)
+            continue
+        time, fraction, offset = match.groups()
+        # datetime64[us] keeps at most 6 fractional digits, like datetime does
+        local.append(time.replace(' ', 'T') + ('.' + fraction[:6] if fraction else ''))
+        offsets.append(offset_microseconds(offset))
+
+    microseconds = np.array(local, dtype='datetime64[us]').astype(np.int64) - np.array(offsets, dtype=np.int64)
+    if fallback:
+        from index import parse_timestamp
+
+        for i in fallback:
+            microseconds[i] = to_microseconds(parse_timestamp(values[i]))
+    return microseconds
+
+
+"""
+Parses a column of timestamp strings (None for events without a timestamp) into an int64 array
+of microseconds since the epoch, NO_TIMESTAMP for the missing ones.
+Every distinct string is parsed once, generated logs repeat the same few timestamps a lot.
+decode converts a raw value (e.g. the bytes of an attribute) into the string to parse.
+"""
+def parse_timestamps(values, decode=None):
+    index = {None: 0}
+    codes = [index.setdefault(value, len(index)) for value in values]
+
+    unique = list(index)[1:]
+    if decode is not None:
+        unique = [decode(value) for value in unique]
+
+    table = np.empty(len(index), dtype=np.int64)
+    table[0] = NO_TIMESTAMP
+    if unique:
+        table[1:] = parse_unique(unique)
+    return table[np.asarray(codes, dtype=np.int64)] if codes else np.zeros(0, dtype=np.int64)